@@ -1,5 +1,6 @@
 import asyncio
 import json
+import multiprocessing
 import os.path
 import shutil
 import sys
@@ -12,15 +13,19 @@ from PySide6.QtGui import QPixmap, QAction, QFont, QPainter, QColor, QIcon
 from PySide6.QtNetwork import QNetworkAccessManager
 from PySide6.QtWidgets import (
     QApplication, QWidget, QLabel, QListWidget, QListWidgetItem,
-    QVBoxLayout, QHBoxLayout, QAbstractItemView, QPushButton, QProgressBar, QMessageBox, QMainWindow, QProgressDialog,
+    QVBoxLayout, QHBoxLayout, QAbstractItemView, QPushButton, QProgressBar, QMessageBox, QMainWindow,
     QStackedWidget, QLineEdit, QSizePolicy
 )
 
-from book_util import WereadGenerate, load_my_books, load_local_books, set_book_is_download, load_fav_books
-from component import ExportDialog, BookItemWidget, DataLoadWindow, LoginAsyncWorker, AsyncDownloadWorker, \
+from book_util import WereadGenerate, load_my_books, load_local_books, set_book_is_download, load_fav_books, \
+    req_goto_search_page
+from component import ExportDialog, BookItemWidget, LoginAsyncWorker, AsyncDownloadWorker, \
     AsyncSearchWorker, ImageDownloader, ToastNotification, ClickableLabel
 from constants import COVER_DIR, LOCAL_BOOK_SHELF_PATH, FAV_BOOK_SHELF_PATH, BOOK_DIR
 from shelf import login_weread, load_browser, load_search_browser
+from browser_service import browser_service
+from search_cache import search_cache
+from constants import SEARCH_PREFETCH_DEPTH
 from button_component import BootstrapButton
 
 
@@ -120,6 +125,18 @@ class SearchPageWidget(QWidget):
         super().__init__(parent)
         self.max_idx = 0
         self.search_url = None
+        self.keyword = None
+        self.headers = {}
+        self.page_count = 0
+        self.worker = None
+        self.more_worker = None
+        self.refresh_workers = []
+        # 下一页预取：(scope, maxIdx) -> worker；waiting_page 为用户已点击、正在预取的页
+        self.prefetch_workers = {}
+        self.retired_workers = []
+        self.waiting_page = None
+        self.cover_cache = {}
+        self.cover_pending = set()
         self._setup_ui()
         self._setup_connections()
 
@@ -188,6 +205,10 @@ class SearchPageWidget(QWidget):
     @Slot(str, QPixmap)
     def update_cover_image(self, book_id, pixmap):
         """槽函数：接收下载完成的图片，更新 UI"""
+        self.cover_pending.discard(book_id)
+        if not pixmap.isNull():
+            # 预取的封面先缓存，翻页显示时直接使用
+            self.cover_cache[book_id] = pixmap
         if book_id in self.cover_labels:
             label = self.cover_labels[book_id]
             if not pixmap.isNull():
@@ -213,31 +234,254 @@ class SearchPageWidget(QWidget):
         # 演示：清空并添加结果
         self.search_results_list.clear()
         if query:
-            self.search_results_list.addItem(f"正在搜索 '{query}'...")
-            self.max_idx = 0
+            self.keyword = query
+            self._retire_worker(self.more_worker)
+            self.more_worker = None
+            # 上一次搜索可能还在进行
+            self._retire_worker(self.worker)
+            self.worker = None
+            self.page_count = 0
+            self.load_more_button.hide()
+            self._cancel_prefetch()
+
+            # 有缓存先显示；缓存未过期时不再请求，过期时后台刷新
+            cached = search_cache.get(query)
+            if cached:
+                url, data, fresh = cached
+                self._show_first_page(url, self.headers, data)
+                if fresh:
+                    return
+            else:
+                self.search_results_list.addItem(f"正在搜索 '{query}'...")
+
             self.worker = AsyncSearchWorker(query)
             self.worker.results_signal.connect(self.init_search_param)
+            self.worker.failed_signal.connect(self.on_search_failed)
             self.worker.start()
         else:
             self.search_results_list.addItem("请输入有效的搜索关键词。")
 
-    def init_search_param(self, url, headers, result):
+    def _show_first_page(self, url, headers, result):
         self.search_url = url
         self.headers = headers
+        self.max_idx = 0
+        self.page_count = 1
+        self.search_results_list.clear()
         self.display_results(result)
+        self._prefetch_after_render(result)
+
+    def init_search_param(self, url, headers, result):
+        # 已经开始了新的搜索，丢弃旧结果
+        if self.sender() is not self.worker:
+            return
+        search_cache.put(self.keyword, None, 0, url, result)
+        # 显示缓存后用户已经翻页时，只更新缓存，不打断当前列表
+        if self.page_count > 1:
+            return
+        self._show_first_page(url, headers, result)
+
+    def on_search_failed(self, msg):
+        if self.sender() is self.worker:
+            if self.page_count:
+                # 正在显示缓存结果，刷新失败不影响
+                print(msg)
+                return
+            self.search_results_list.clear()
+            self.search_results_list.addItem(msg)
+        elif self.sender() is self.more_worker:
+            self._retire_worker(self.more_worker)
+            self.more_worker = None
+            self.load_more_button.setEnabled(True)
+            self.update_ui_for_results(True)
+            self.load_more_button.setText(f"{msg}，点击重试")
 
     def load_more_requested(self):
         #     https://weread.qq.com/api/store/search?keyword=java&sid=1GFF2LFhA0&scope=17&maxIdx=5&count=20
-        url = f'{self.search_url}&scope={self.scope}&maxIdx={self.max_idx}&count=20'
-        print(url)
+        # 翻页请求在工作线程中完成，不阻塞界面
+        if self.more_worker is not None or self.waiting_page is not None:
+            return
+
+        # 下一页正在预取，等预取结果到达后直接追加
+        page = (self.scope, self.max_idx)
+        if page in self.prefetch_workers:
+            self.waiting_page = page
+            self.load_more_button.setEnabled(False)
+            self.load_more_button.setText("正在加载...")
+            return
+
+        cached = search_cache.get(self.keyword, self.scope, self.max_idx)
+        if cached:
+            url, data, fresh = cached
+            if not fresh:
+                self._refresh_page(self.keyword, self.scope, self.max_idx)
+            self._append_page(data)
+            return
+
+        self.load_more_button.setEnabled(False)
+        self.load_more_button.setText("正在加载...")
 
-        resp = requests.get(url, headers=self.headers)
+        self.more_worker = AsyncSearchWorker(self.keyword, self.scope, self.max_idx)
+        self.more_worker.results_signal.connect(self.on_more_results)
+        self.more_worker.failed_signal.connect(self.on_search_failed)
+        self.more_worker.start()
 
-        data = resp.json()
-        has_more = data['hasMore']
+    def on_more_results(self, url, headers, data):
+        worker = self.sender()
+        if worker is not self.more_worker:
+            return
+        self._retire_worker(worker)
+        self.more_worker = None
+        self.load_more_button.setEnabled(True)
+
+        search_cache.put(worker.query, worker.scope, worker.max_idx, url, data)
+        self._append_page(data)
+
+    def _append_page(self, data):
+        self.page_count += 1
+        has_more = data.get('hasMore')
         self.display_results(data)
         self.update_ui_for_results(has_more)
+        self._prefetch_after_render(data)
+
+    # ---------- 下一页预取 ----------
+
+    @staticmethod
+    def _next_page(data, max_idx):
+        """
+        :return: data 之后一页的 (scope, maxIdx)，没有更多时返回 None
+        """
+        for t in data.get('results', []):
+            if t['title'] == '电子书':
+                next_idx = max_idx + t['currentCount']
+                if t['currentCount'] and next_idx < t['scopeCount']:
+                    return t['scope'], next_idx
+        return None
+
+    def _prefetch_after_render(self, data):
+        # 当前页渲染后 self.scope / self.max_idx 已指向下一页，本页起点为 self.max_idx - self.current_count
+        if self._next_page(data, 0) is not None and self.max_idx < self.scope_count:
+            self._prefetch(self.scope, self.max_idx, 1)
+
+    def _prefetch(self, scope, max_idx, depth):
+        """
+        后台请求 (scope, maxIdx) 页及其封面，结果写入搜索缓存；最多预取到当前页之后 SEARCH_PREFETCH_DEPTH 页
+        """
+        page = (scope, max_idx)
+        if depth > SEARCH_PREFETCH_DEPTH or page in self.prefetch_workers:
+            return
+
+        cached = search_cache.get(self.keyword, scope, max_idx)
+        if cached and cached[2]:
+            self._prefetch_covers(cached[1])
+            self._prefetch_next(cached[1], max_idx, depth)
+            return
+
+        worker = AsyncSearchWorker(self.keyword, scope, max_idx)
+        worker.depth = depth
+        worker.results_signal.connect(self.on_prefetched)
+        worker.failed_signal.connect(self.on_prefetch_failed)
+        worker.finished.connect(self._on_prefetch_finished)
+        self.prefetch_workers[page] = worker
+        worker.start()
+
+    def _prefetch_next(self, data, max_idx, depth):
+        page = self._next_page(data, max_idx)
+        if page is not None:
+            self._prefetch(*page, depth + 1)
+
+    def _prefetch_covers(self, data):
+        for t in data.get('results', []):
+            if t['title'] != '电子书':
+                continue
+            for item in t['books']:
+                book_info = item.get('bookInfo', {})
+                book_id = book_info.get('bookId')
+                cover_url = book_info.get('cover', '')
+                if cover_url and book_id not in self.cover_cache and book_id not in self.cover_pending:
+                    self.cover_pending.add(book_id)
+                    self.image_downloader.start_download(book_id, cover_url)
+
+    def on_prefetched(self, url, headers, data):
+        worker = self.sender()
+        page = (worker.scope, worker.max_idx)
+        if self.prefetch_workers.get(page) is not worker:
+            return
+
+        search_cache.put(worker.query, worker.scope, worker.max_idx, url, data)
+        self._prefetch_covers(data)
+
+        if self.waiting_page == page:
+            # 用户已经点了「加载更多」，直接追加（追加后会继续预取下一页）
+            self.waiting_page = None
+            self.load_more_button.setEnabled(True)
+            self._append_page(data)
+        else:
+            self._prefetch_next(data, worker.max_idx, worker.depth)
+
+    def on_prefetch_failed(self, msg):
+        worker = self.sender()
+        page = (worker.scope, worker.max_idx)
+        if self.prefetch_workers.get(page) is not worker:
+            return
+        print(f'预取失败：{msg}')
+        if self.waiting_page == page:
+            self.waiting_page = None
+            self.load_more_button.setEnabled(True)
+            self.update_ui_for_results(True)
+            self.load_more_button.setText(f"{msg}，点击重试")
+
+    def _on_prefetch_finished(self):
+        worker = self.sender()
+        if worker is None:
+            # 已结束的线程被取消后释放，排队中的信号到达时发送者已不存在
+            return
+        page = (worker.scope, worker.max_idx)
+        if self.prefetch_workers.get(page) is worker:
+            del self.prefetch_workers[page]
+
+    def _retire_worker(self, worker):
+        """
+        不再使用的搜索线程：取消请求，并保留引用直到线程结束（运行中的 QThread 被回收会导致程序退出）
+        """
+        if worker is None:
+            return
+        worker.cancel()
+        worker.finished.connect(self._on_retired_finished)
+        if not worker.isFinished():
+            self.retired_workers.append(worker)
+
+    def _on_retired_finished(self):
+        worker = self.sender()
+        if worker is not None and worker in self.retired_workers:
+            self.retired_workers.remove(worker)
+
+    def _cancel_prefetch(self):
+        """
+        新的搜索开始：取消所有预取
+        """
+        for worker in self.prefetch_workers.values():
+            self._retire_worker(worker)
+        self.prefetch_workers.clear()
+        self.waiting_page = None
+        self.load_more_button.setEnabled(True)
+        self.cover_cache.clear()
+
+    def _refresh_page(self, keyword, scope, max_idx):
+        """
+        后台刷新已过期的翻页缓存，结果只写入缓存
+        """
+        worker = AsyncSearchWorker(keyword, scope, max_idx)
+        worker.results_signal.connect(self.on_page_refreshed)
+        worker.finished.connect(self._on_refresh_finished)
+        self.refresh_workers.append(worker)
+        worker.start()
 
+    def on_page_refreshed(self, url, headers, data):
+        worker = self.sender()
+        search_cache.put(worker.query, worker.scope, worker.max_idx, url, data)
+
+    def _on_refresh_finished(self):
+        self.refresh_workers.remove(self.sender())
 
     def update_ui_for_results(self, has_more_pages):
         """
@@ -281,7 +525,8 @@ class SearchPageWidget(QWidget):
             self.search_results_list.addItem("未找到匹配的书籍。")
         else:
             book_util = WereadGenerate()
-            for number, item in enumerate(books):
+            book_hashes = book_util.book_hash_many(item.get('bookInfo', {})['bookId'] for item in books)
+            for number, (item, book_hash) in enumerate(zip(books, book_hashes)):
                 # 确保数据结构正确，提取 bookInfo
                 book_info = item.get('bookInfo', {})
                 book_id = book_info['bookId']
@@ -290,7 +535,7 @@ class SearchPageWidget(QWidget):
                 # cover_url = book_info.get('cover', '')
                 rating_count = book_info.get('newRatingCount', 0)
 
-                book_info['bookHash'] = book_util.book_hash(book_info['bookId'])
+                book_info['bookHash'] = book_hash
 
                 # 2. 创建 QListWidgetItem 容器
                 list_item = QListWidgetItem(self.search_results_list)
@@ -313,8 +558,12 @@ class SearchPageWidget(QWidget):
                 self.cover_labels[book_id] = cover_label
                 # 3. 异步启动下载 (非阻塞)
                 cover_url = book_info.get('cover', '')
-                if cover_url:
+                if book_id in self.cover_cache:
+                    cover_label.setPixmap(
+                        self.cover_cache[book_id].scaled(40, 60, Qt.AspectRatioMode.KeepAspectRatio))
+                elif cover_url and book_id not in self.cover_pending:
                     # ⚠️ 启动下载，使用 QMetaObject.invokeMethod 确保在 UI 线程执行
+                    self.cover_pending.add(book_id)
                     self.image_downloader.start_download(book_id, cover_url)
                 item_layout.addWidget(cover_label)
 
@@ -784,7 +1033,8 @@ class DownloadPageWidget(QWidget):
 
     def _setup_ui(self):
 
-        set_book_is_download(self.books)
+        if set_book_is_download(self.books):
+            self._save_to_json()
 
         main_layout = QVBoxLayout(self)
         main_layout.addWidget(QLabel("<h4>下载列表</h4><hr>"))
@@ -925,7 +1175,8 @@ class DownloadPageWidget(QWidget):
             self.show_favorite_message(f'添加到下载队列')
             self.books.append(book)
             self.book_ids.add(book['bookId'])
-            set_book_is_download(self.books)
+            # 只需要计算新加入的书
+            set_book_is_download([book])
             self._save_to_json()
 
             if self.is_init:
@@ -1196,7 +1447,8 @@ class WeReadWindow(QMainWindow):
         self.user_data = user_data
         self.book_util = WereadGenerate()
         self.tasks = {}
-        self.loading_dialog = None
+        # 后台同步书架的线程
+        self.async_worker = None
 
         self.setWindowTitle("WeRead 书架-试用版 - beat")
         self.resize(1000, 800)
@@ -1248,6 +1500,16 @@ class WeReadWindow(QMainWindow):
         # 4. 初始化和连接导航
         self._setup_navigation_connection()
 
+        # 5. 状态栏：后台同步书架时显示，不阻塞操作
+        self.sync_label = QLabel("正在同步书架...")
+        self.sync_bar = QProgressBar()
+        self.sync_bar.setRange(0, 0)
+        self.sync_bar.setMaximumWidth(120)
+        self.statusBar().addPermanentWidget(self.sync_label)
+        self.statusBar().addPermanentWidget(self.sync_bar)
+        self.sync_label.hide()
+        self.sync_bar.hide()
+
     def _create_menu_bar(self):
         """创建和配置菜单栏"""
         menu_bar = self.menuBar()  # 获取 QMainWindow 的菜单栏
@@ -1310,12 +1572,12 @@ class WeReadWindow(QMainWindow):
         avatar_label.setPixmap(avatar)
         avatar_label.clicked.connect(lambda : webbrowser.open("https://weread.qq.com/web/shelf"))
 
-        info_label = QLabel(
+        self.info_label = QLabel(
             f"<b>{self.user_data.get('name', 'N/A')}</b><br>"
             # f"<small>UserVid: {self.user_data.get('userVid', 'N/A')}</small>"
         )
         user_box.addWidget(avatar_label)
-        user_box.addWidget(info_label)
+        user_box.addWidget(self.info_label)
         nav_layout.addLayout(user_box)
         nav_layout.addSpacing(15)
 
@@ -1374,29 +1636,16 @@ class WeReadWindow(QMainWindow):
 
     def refresh_bookshelf(self):
         """
-                触发重新加载书架数据的逻辑，并在 QThread 中执行
-                """
+        在后台同步书架，状态栏显示同步状态，不阻塞界面
+        """
         print("--- 刷新书架动作被触发 ---")
+        if self.async_worker is not None and self.async_worker.isRunning():
+            self.statusBar().showMessage("书架正在同步中...", 3000)
+            return
 
-        # 1. 创建并配置加载对话框 (QProgressDialog 适合加载)
-        self.loading_dialog = QProgressDialog(
-            "正在重新加载书架数据，请稍候...",
-            None,  # 不显示取消按钮文本
-            0, 0,  # 设置为不确定进度条
-            self
-        )
-        self.loading_dialog.setWindowTitle("刷新中")
-        self.loading_dialog.setWindowModality(Qt.ApplicationModal)
-        self.loading_dialog.setMinimumDuration(0)
-
-        # 禁用关闭按钮 (X)，并自定义窗口边框
-        self.loading_dialog.setWindowFlags(
-            self.loading_dialog.windowFlags() & ~Qt.WindowCloseButtonHint
-            | Qt.CustomizeWindowHint
-        )
-        self.loading_dialog.show()
+        self.sync_label.show()
+        self.sync_bar.show()
 
-        # 2. 创建并启动异步工作线程
         self.async_worker = LoginAsyncWorker()
         self.async_worker.finished.connect(self.on_refresh_finished)
         self.async_worker.books_signal.connect(self.bookshelf_page.update_books)
@@ -1406,17 +1655,18 @@ class WeReadWindow(QMainWindow):
         """
         异步任务完成时，在主线程中执行的槽函数
         """
-        # 1. 自动关闭加载对话框
-        if self.loading_dialog:
-            self.loading_dialog.close()
-            self.loading_dialog = None
-
-        # 2. 启用刷新按钮
-        # self.findChild(QAction, "refresh_action").setEnabled(True)
+        self.sync_label.hide()
+        self.sync_bar.hide()
 
-        # 3. 显示结果和更新 UI
-        QMessageBox.information(self, "完成", "书架数据已成功刷新！")
+        worker = self.sender()
+        if worker.delta is None:
+            self.statusBar().showMessage("书架同步失败，显示的是本地书架，可稍后按 F5 重试。")
+            return
 
+        if worker.user_data:
+            self.user_data = worker.user_data
+            self.info_label.setText(f"<b>{self.user_data.get('name', 'N/A')}</b><br>")
+        self.statusBar().showMessage(f"书架已同步：{worker.delta}", 10000)
 
     def closeEvent(self, event):
         # asyncio.get_event_loop().create_task(self.cleanup())
@@ -1435,31 +1685,22 @@ def load_user_info():
 def weread_main():
     app = QApplication(sys.argv)  # pyside6
 
-    print("starting login...")
-
-    window = None
-
-    def start_app(r):
-        nonlocal window
-        print('start app..')
-        if r:
-            user_data = load_user_info()
-            window = WeReadWindow(user_data, )
-            window.show()
-        else:
-            QMessageBox.warning(None, "完成", "数据加载失败！关闭程序。")
-
-    is_init = True  # 是否打开登录页面登录
-    # is_init = False
-
-    # 实例化主窗口，加载过程会自动开始
-    main_window = DataLoadWindow(is_init)
+    # 共享浏览器在后台预热（启动 Chromium、加载会话、打开搜索页），登录 / 搜索 / 下载直接复用
+    browser_service.warmup(search_page=req_goto_search_page)
+    app.aboutToQuit.connect(browser_service.stop)
 
-    main_window.loaded_signal.connect(start_app)
+    # 先用本地保存的书架（book_shelf.json / local_book_shelf.json / fav_book_shelf.json）显示主窗口，
+    # 书架在后台同步，完成后更新页面；会话失效时同步过程中会打开浏览器扫码登录
+    print('start app..')
+    window = WeReadWindow(load_user_info())
+    window.show()
+    window.refresh_bookshelf()
 
     sys.exit(app.exec())
 
 
 if __name__ == '__main__':
+    # 打包后使用进程池解码（DECODE_EXECUTOR = 'process'）需要
+    multiprocessing.freeze_support()
     print("init loop")
     weread_main()
@@ -0,0 +1,1022 @@
+'''
+解码 / 加密函数的离线基准测试与回归校验
+
+python benchmark.py corpus      # 重新录制 corpus/ 下的样本（以原实现的输出为准）
+python benchmark.py verify      # 用 corpus/ 和随机样本校验当前实现，本地模拟服务器校验长书的重试预算和书架增量同步
+python benchmark.py run --json bench.json                        # 吞吐量 + 内存分配
+python benchmark.py run --compare bench.json                     # 与另一个提交的结果对比
+python benchmark.py decode / params / stream                     # 单项对比
+python benchmark.py parts       # 本地模拟服务器：章节分段顺序请求 vs 并发请求
+python benchmark.py ratelimit   # 本地模拟服务器限流：固定 DOWNLOAD_DELAY vs 自适应限速
+python benchmark.py transport   # 本地模拟服务器：playwright page.request vs aiohttp 连接池
+python benchmark.py search      # 搜索延迟：每次启动浏览器 vs 预热的 browser_service（需联网）
+python benchmark.py shelf       # 本地模拟服务器：1000 / 5000 本书架的 syncBook 顺序请求 vs 并发请求
+python benchmark.py library     # 下载状态：逐本读取清单 / 遍历章节目录 vs 书库索引
+
+不依赖网络和浏览器，章节密文由 encode_chapter 反向生成，可生成任意大小的章节。
+'''
+import argparse
+import asyncio
+import base64
+import contextlib
+import io
+import json
+import logging
+import os
+import random
+import re
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from unittest import mock
+
+import book_util
+from book_util import _resolve_content, _shuffle_index, WereadParamsGenerate, BookRequestSession, WereadGenerate, \
+    ChapterDecoder, resolve_content, _book_hash, req_book_chapters_content
+
+CORPUS_DIR = Path(__file__).parent / 'corpus'
+
+
+# ----------------------------
+# 原实现（对照组）
+# ----------------------------
+def legacy_resolve_content(texts):
+    t = "".join(s[32:] for s in texts)
+    t = t[1:]
+
+    def a(s: str):
+        length = len(s)
+        if length < 4:
+            return []
+        if length < 11:
+            return [0, 2]
+
+        n = min(4, -(-length // 10))  # ceil(length / 10)
+        tmp = ""
+        for i in range(length - 1, length - 1 - n, -1):
+            tmp += str(int(bin(ord(s[i]))[2:], 4))
+
+        arr = []
+        m = length - n - 2
+        step = len(str(m))
+
+        i = 0
+        while len(arr) < 10 and i + step < len(tmp):
+            v = int(tmp[i:i + step])
+            arr.append(v % m)
+            v2 = int(tmp[i + 1:i + 1 + step])
+            arr.append(v2 % m)
+            i += step
+        return arr
+
+    def b(s: str, arr):
+        chars = list(s)
+        for i in range(len(arr) - 1, -1, -2):
+            for k in (1, 0):
+                idx1 = arr[i] + k
+                idx2 = arr[i - 1] + k
+                chars[idx1], chars[idx2] = chars[idx2], chars[idx1]
+        return "".join(chars)
+
+    def replace_utf8(m: re.Match):
+        chunk = m.group(0)
+        l = len(chunk)
+        if l == 4:
+            val = ((ord(chunk[0]) & 0x7) << 18) | ((ord(chunk[1]) & 0x3F) << 12) | ((ord(chunk[2]) & 0x3F) << 6) | (
+                    ord(chunk[3]) & 0x3F)
+            val -= 0x10000
+            return chr(0xD800 + (val >> 10)) + chr(0xDC00 + (val & 0x3FF))
+        elif l == 3:
+            return chr(((ord(chunk[0]) & 0xF) << 12) | ((ord(chunk[1]) & 0x3F) << 6) | (ord(chunk[2]) & 0x3F))
+        else:
+            return chr(((ord(chunk[0]) & 0x1F) << 6) | (ord(chunk[1]) & 0x3F))
+
+    arr = a(t)
+    encodeStr = b(t, arr)
+
+    decoded_bytes = base64.b64decode(encodeStr)
+    text = decoded_bytes.decode(errors="ignore")
+
+    pattern = re.compile(r'[\xC0-\xDF][\x80-\xBF]|[\xE0-\xEF][\x80-\xBF]{2}|[\xF0-\xF7][\x80-\xBF]{3}')
+    text = pattern.sub(replace_utf8, text)
+
+    return text
+
+
+# ----------------------------
+# 反向编码：明文 -> 接口响应分段
+# ----------------------------
+def encode_chapter(text, parts: int = 2, seed: int = 0):
+    """
+    生成 _resolve_content 可以解码的分段响应，每段带 32 位前缀。
+    交换下标只由末尾几个字符决定且不会触及它们，所以逆序执行同样的交换即可还原。
+    :param text: str 或原始 bytes（用于构造非法 UTF-8）
+    """
+    rnd = random.Random(seed)
+    raw = text.encode('utf8') if isinstance(text, str) else text
+    buf = bytearray(base64.b64encode(raw))
+
+    arr = _shuffle_index(buf)
+    for i in range(1, len(arr), 2):
+        for k in (0, 1):
+            idx1 = arr[i] + k
+            idx2 = arr[i - 1] + k
+            buf[idx1], buf[idx2] = buf[idx2], buf[idx1]
+
+    payload = rnd.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ') + buf.decode('ascii')
+    size = -(-len(payload) // parts)
+    texts = []
+    for i in range(parts):
+        prefix = '%032x' % rnd.getrandbits(128)
+        texts.append(prefix + payload[i * size:(i + 1) * size])
+    return texts
+
+
+def encode_epub_chapter(text, css='p { text-indent: 2em; }', seed: int = 0):
+    """
+    epub 章节：e_0 / e_1 / e_3 是正文，e_2 是样式
+    """
+    content = encode_chapter(text, parts=3, seed=seed)
+    return [content[0], content[1], encode_chapter(css, parts=1, seed=seed)[0], content[2]]
+
+
+def sample_text(size: int, seed: int = 0) -> str:
+    """
+    生成约 size 字节（UTF-8）的中英混排章节
+    """
+    rnd = random.Random(seed)
+    words = ['<p>', '</p>\n', '微信读书', '章节内容', '的', '了', '，', '。', 'WeRead', ' epub ', '“引文”', '😀']
+    out = []
+    total = 0
+    while total < size:
+        w = rnd.choice(words)
+        out.append(w)
+        total += len(w.encode('utf8'))
+    return ''.join(out)
+
+
+def mojibake(text: str) -> bytes:
+    """
+    双重 UTF-8 编码：接口对部分旧书返回的就是这种内容
+    """
+    return text.encode('utf8').decode('latin-1').encode('utf8')
+
+
+def corpus_cases():
+    """
+    覆盖解码各分支的样本：(名称, 明文 str/bytes)
+    """
+    chapter = sample_text(2 * 1024, seed=1).replace('😀', '')
+    return [
+        ('ascii', '<p>Hello WeRead</p>' * 50),
+        ('cjk', chapter),
+        ('cjk-emoji', sample_text(2 * 1024, seed=2)),
+        ('mojibake', mojibake(chapter)),
+        ('mojibake-emoji', mojibake('表情😀结尾' * 20)),
+        ('mixed', chapter.encode('utf8') + mojibake('乱码段落') + '正常段落'.encode('utf8')),
+        ('latin-1', 'café résumé naïve Ångström ÷ ×' * 10),
+        ('overlong', b'<p>' + '\xc0\x80'.encode('utf8') + b'</p>' * 10),
+        ('invalid-bytes', b'\xff\xfe<p>' + '正文'.encode('utf8')[:-1] + b'</p>' * 10),
+        ('short', 'ab'),
+    ]
+
+
+# ----------------------------
+# 录制样本
+# ----------------------------
+HASH_SAMPLES = [1, 42, 3300107269, 1234567890123456789, 'CB_1234', 'abc', '1734400000']
+SIGN_SAMPLES = ['', 'a', 'ab', 'b=abc&c=def', 'b=0eb32540813ab9066g019237&c=c4c329b011c4ca4238a0201&ct=1734400000']
+
+
+def _fixed_clock():
+    """
+    固定 ct / r，使 get_request_param 的输出可以录制
+    """
+    return mock.patch.multiple(book_util, time=mock.Mock(time=lambda: 1734400000.5), random=lambda: 0.1234)
+
+
+def _dump_text(text):
+    """
+    原实现对 4 字节双重编码输出的是单独的代理项，JSON 读回时会被合并，这种情况按 base64 存储
+    """
+    if text is None:
+        return None
+    try:
+        text.encode('utf8')
+        return text
+    except UnicodeError:
+        return {'surrogatepass': base64.b64encode(text.encode('utf8', 'surrogatepass')).decode('ascii')}
+
+
+def _load_text(value):
+    if isinstance(value, dict):
+        return base64.b64decode(value['surrogatepass']).decode('utf8', 'surrogatepass')
+    return value
+
+
+def record_corpus():
+    """
+    以原实现为准录制样本：每个章节一个 JSON（txt 两段 / epub e_0~e_3 四段），加密函数一个 crypto.json
+    """
+    CORPUS_DIR.mkdir(exist_ok=True)
+    for name, text in corpus_cases():
+        for fmt in ('txt', 'epub'):
+            if fmt == 'txt':
+                parts = encode_chapter(text, parts=2, seed=7)
+                expected, css = legacy_resolve_content(parts), None
+            else:
+                parts = encode_epub_chapter(text, seed=7)
+                expected = legacy_resolve_content([parts[0], parts[1], parts[3]])
+                css = legacy_resolve_content([parts[2]])
+            json.dump({'name': name, 'format': fmt, 'parts': parts,
+                       'expected': _dump_text(expected), 'css': _dump_text(css)},
+                      (CORPUS_DIR / f'{name}.{fmt}.json').open('w', encoding='utf8'), ensure_ascii=False, indent=4)
+
+    generate = WereadGenerate()
+    with _fixed_clock():
+        params = [WereadParamsGenerate('3300107269', cid, 'psvts-sample', '1734400000').get_request_param()
+                  for cid in (1, 2, 120, 4096)]
+    json.dump({
+        'book_hash': {str(s): generate.book_hash(s) for s in HASH_SAMPLES},
+        'sign': {s: generate._0x58fb1d(s) for s in SIGN_SAMPLES},
+        'params': {
+            'book_id': '3300107269', 'psvts': 'psvts-sample', 'pclts': '1734400000',
+            'chapters': [1, 2, 120, 4096], 'expected': params,
+        },
+    }, (CORPUS_DIR / 'crypto.json').open('w', encoding='utf8'), ensure_ascii=False, indent=4)
+    print(f'corpus: {len(list(CORPUS_DIR.iterdir()))} files -> {CORPUS_DIR}')
+
+
+def _write_legacy(texts, path):
+    """
+    按下载线程原来的方式写文件，返回 UnicodeError 或 None
+    """
+    try:
+        content = legacy_resolve_content(texts) if isinstance(texts, list) else texts
+        if content:
+            open(path, 'w', encoding='utf8').write(content)
+    except UnicodeError:
+        return UnicodeError
+
+
+def _write_stream(fmt, parts, path, chunk_size=64):
+    decoder = ChapterDecoder({'format': fmt}, chunk_size=chunk_size)
+    for index in reversed(range(len(parts))):
+        decoder.feed(index, parts[index])
+    try:
+        decoder.write_to(path)
+    except UnicodeError:
+        return UnicodeError
+
+
+def _same_file(tmp, expected, fmt, parts):
+    """
+    expected 为章节文本（或原实现的分段），比较两种方式写出的文件
+    """
+    expected_path = os.path.join(tmp, 'expected')
+    actual_path = os.path.join(tmp, 'actual')
+    for p in (expected_path, actual_path):
+        if os.path.exists(p):
+            os.remove(p)
+    e = _write_legacy(expected, expected_path)
+    a = _write_stream(fmt, parts, actual_path)
+    if e or a:
+        return e is a
+    return _read(expected_path) == _read(actual_path)
+
+
+def verify_corpus():
+    """
+    校验 corpus/ 下录制的样本
+    """
+    failed = 0
+    files = sorted(CORPUS_DIR.glob('*.*.json'))
+    with tempfile.TemporaryDirectory() as tmp:
+        for fp in files:
+            case = json.load(fp.open(encoding='utf8'))
+            case['expected'], case['css'] = _load_text(case['expected']), _load_text(case['css'])
+            content, css = resolve_content(case['parts'], {'format': case['format']})
+            if (content, css) != (case['expected'], case['css']):
+                failed += 1
+                print(f'FAIL corpus {fp.name}')
+            if not _same_file(tmp, case['expected'], case['format'], case['parts']):
+                failed += 1
+                print(f'FAIL corpus stream {fp.name}')
+
+    crypto_path = CORPUS_DIR / 'crypto.json'
+    if crypto_path.exists():
+        crypto = json.load(crypto_path.open(encoding='utf8'))
+        generate = WereadGenerate()
+        for s, h in crypto['book_hash'].items():
+            if generate.book_hash(s) != h:
+                failed += 1
+                print(f'FAIL book_hash {s}')
+        for s, h in crypto['sign'].items():
+            if generate._0x58fb1d(s) != h:
+                failed += 1
+                print(f'FAIL _0x58fb1d {s!r}')
+        p = crypto['params']
+        with _fixed_clock():
+            session = BookRequestSession(p['book_id'], p['psvts'], p['pclts'])
+            for cid, expected in zip(p['chapters'], p['expected']):
+                legacy = WereadParamsGenerate(p['book_id'], cid, p['psvts'], p['pclts']).get_request_param()
+                if legacy != expected or session.get_request_param(cid) != expected:
+                    failed += 1
+                    print(f'FAIL params chapter={cid}')
+    print(f'corpus: {len(files)} chapters checked')
+    return failed
+
+
+def verify():
+    """
+    录制样本 + 随机分段：逐个比较当前实现与原实现的输出，分 2/3/4 段（txt / epub）各跑一遍
+    """
+    failed = verify_corpus()
+    for name, text in corpus_cases():
+        for parts in (2, 3, 4):
+            texts = encode_chapter(text, parts=parts, seed=parts)
+            expected = legacy_resolve_content(texts)
+            actual = _resolve_content(texts)
+            if actual != expected:
+                failed += 1
+                print(f'FAIL {name} parts={parts}')
+
+    # 流式解码：乱序喂入、小分块，写出的文件与原实现写出的文件一致
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, text in corpus_cases():
+            for fmt, parts in (('txt', 2), ('epub', 4)):
+                if fmt == 'txt':
+                    texts = encode_chapter(text, parts=parts, seed=parts)
+                    content = texts
+                else:
+                    texts = encode_epub_chapter(text, seed=parts)
+                    content = [texts[0], texts[1], texts[3]]
+                if not _same_file(tmp, content, fmt, texts):
+                    failed += 1
+                    print(f'FAIL stream {name} {fmt}')
+
+    # 签名：按原顺序重新拼接签名串，签名必须一致
+    generate = WereadGenerate()
+    session = BookRequestSession('3300107269', 'psvts-sample', '1734400000')
+    for chapter_id in (1, 2, 120, 4096):
+        param = session.get_request_param(chapter_id)
+        legacy = WereadParamsGenerate('3300107269', chapter_id, 'psvts-sample', '1734400000')
+        sign = generate._0x58fb1d('&'.join([f'{k}={v}' for k, v in param.items() if k != 's']))
+        if param['s'] != sign or param['b'] != legacy.generate.book_hash('3300107269') \
+                or list(param) != list(legacy.get_request_param()):
+            failed += 1
+            print(f'FAIL params chapter={chapter_id}')
+
+    # 长书在偶发错误下不会因为重试预算用完而中断
+    if verify_retry_budget():
+        failed += 1
+        print('FAIL retry budget')
+    failed += verify_shelf_sync()
+
+    print('verify: ' + ('ok' if not failed else f'{failed} failed'))
+    return failed == 0
+
+
+def _measure(func, args, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        cost = time.perf_counter() - start
+        best = cost if best is None else min(best, cost)
+    return best
+
+
+def bench_decode(repeat=5):
+    sizes = [('small', 4 * 1024), ('medium', 64 * 1024), ('large', 1024 * 1024), ('x-large', 4 * 1024 * 1024)]
+
+    print(f'{"size":<10}{"legacy MB/s":>14}{"current MB/s":>14}{"speedup":>10}')
+    for name, size in sizes:
+        text = sample_text(size)
+        texts = encode_chapter(text, parts=3)
+
+        expected = legacy_resolve_content(texts)
+        assert expected == text
+        assert _resolve_content(texts) == expected, f'{name}: 解码结果不一致'
+
+        mb = sum(len(t) for t in texts) / 1024 / 1024
+        legacy = _measure(legacy_resolve_content, (texts,), repeat)
+        current = _measure(_resolve_content, (texts,), repeat)
+        print(f'{name:<10}{mb / legacy:>14.2f}{mb / current:>14.2f}{legacy / current:>9.2f}x')
+
+
+def _read(path):
+    if not os.path.exists(path):
+        return None
+    return open(path, 'rb').read()
+
+
+def bench_stream():
+    """
+    对比「texts 列表 + resolve_content + 写文件」与 ChapterDecoder 的峰值内存
+    """
+    print(f'{"size":<10}{"legacy peak MB":>16}{"stream peak MB":>16}{"stream MB/s":>14}')
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'chapter.xhtml')
+        for name, size in [('medium', 64 * 1024), ('large', 1024 * 1024), ('x-large', 8 * 1024 * 1024)]:
+            texts = encode_epub_chapter(sample_text(size))
+            mb = sum(len(t) for t in texts) / 1024 / 1024
+
+            def legacy():
+                parts = list(texts)
+                content = _resolve_content([parts[0], parts[1], parts[3]])
+                open(path, 'w', encoding='utf8').write(content)
+
+            def stream():
+                decoder = ChapterDecoder({'format': 'epub'})
+                for index, text in enumerate(texts):
+                    decoder.feed(index, text)
+                decoder.write_to(path)
+
+            peaks = []
+            for func in (legacy, stream):
+                tracemalloc.start()
+                func()
+                peaks.append(tracemalloc.get_traced_memory()[1] / 1024 / 1024)
+                tracemalloc.stop()
+
+            cost = _measure(stream, (), 3)
+            print(f'{name:<10}{peaks[0]:>16.2f}{peaks[1]:>16.2f}{mb / cost:>14.2f}')
+
+
+# ----------------------------
+# 基准测试套件
+# ----------------------------
+def _suites():
+    """
+    (名称, 单位, 每次调用处理的量, 函数)；单位 MB 时按密文大小计算吞吐
+    """
+    txt_64k = encode_chapter(sample_text(64 * 1024), parts=2)
+    epub_1m = encode_epub_chapter(sample_text(1024 * 1024))
+    mojibake_64k = encode_chapter(mojibake(sample_text(64 * 1024).replace('😀', '')), parts=2)
+    tmp = tempfile.mkdtemp()
+    path = os.path.join(tmp, 'chapter.xhtml')
+
+    def stream_epub():
+        decoder = ChapterDecoder({'format': 'epub'})
+        for index, text in enumerate(epub_1m):
+            decoder.feed(index, text)
+        decoder.write_to(path)
+
+    generate = WereadGenerate()
+    sign_str = 'b=0eb32540813ab9066g019237&c=c4c329b011c4ca4238a0201&ct=1734400000&pc=0eb32540813ab9066g019237' \
+               '&prevChapter=false&ps=psvts-sample&r=12345678&sc=0&st=0'
+    session = BookRequestSession('3300107269', 'psvts-sample', '1734400000')
+    legacy_gen = WereadParamsGenerate('3300107269', 7, 'psvts-sample', '1734400000')
+
+    def mb(texts):
+        return sum(len(t) for t in texts) / 1024 / 1024
+
+    return [
+        ('resolve_content/txt-64K', 'MB', mb(txt_64k), lambda: resolve_content(txt_64k, {'format': 'txt'})),
+        ('resolve_content/epub-1M', 'MB', mb(epub_1m), lambda: resolve_content(epub_1m, {'format': 'epub'})),
+        ('resolve_content/mojibake-64K', 'MB', mb(mojibake_64k),
+         lambda: resolve_content(mojibake_64k, {'format': 'txt'})),
+        ('ChapterDecoder/epub-1M', 'MB', mb(epub_1m), stream_epub),
+        ('_0x58fb1d', 'ops', 1, lambda: generate._0x58fb1d(sign_str)),
+        ('book_hash/cold', 'ops', 1, lambda: _book_hash.__wrapped__('3300107269')),
+        ('book_hash/cached', 'ops', 1, lambda: generate.book_hash(3300107269)),
+        ('WereadParamsGenerate.get_request_param', 'ops', 1, legacy_gen.get_request_param),
+        ('BookRequestSession.get_request_param', 'ops', 1, lambda: session.get_request_param(7)),
+    ]
+
+
+def run_suites(min_time=0.2, save=None, compare=None):
+    """
+    每项至少运行 min_time 秒取平均；内存为单次调用的 tracemalloc 峰值
+    """
+    baseline = json.load(open(compare, encoding='utf8')) if compare else {}
+    results = {}
+    print(f'{"benchmark":<40}{"throughput":>16}{"peak alloc KB":>16}{"vs base":>10}')
+    for name, unit, amount, func in _suites():
+        func()  # 预热
+
+        tracemalloc.start()
+        func()
+        peak = tracemalloc.get_traced_memory()[1] / 1024
+        tracemalloc.stop()
+
+        count = 0
+        start = time.perf_counter()
+        while True:
+            func()
+            count += 1
+            cost = time.perf_counter() - start
+            if cost >= min_time:
+                break
+        throughput = amount * count / cost
+        results[name] = {'unit': unit, 'throughput': throughput, 'peak_kb': peak}
+
+        delta = ''
+        if name in baseline:
+            delta = f'{throughput / baseline[name]["throughput"] - 1:+.1%}'
+        print(f'{name:<40}{throughput:>12.1f} {unit + "/s":<5}{peak:>14.1f}{delta:>10}')
+
+    if save:
+        json.dump(results, open(save, 'w', encoding='utf8'), ensure_ascii=False, indent=4)
+        print(f'saved: {save}')
+    return results
+
+
+def bench_params(count=20000):
+    book_id, psvts, pclts = '3300107269', 'psvts-sample', f'{int(time.time())}'
+
+    def legacy():
+        for chapter_id in range(count):
+            WereadParamsGenerate(book_id, chapter_id, psvts, pclts).get_request_param()
+
+    def current():
+        session = BookRequestSession(book_id, psvts, pclts)
+        for chapter_id in range(count):
+            session.get_request_param(chapter_id)
+
+    legacy_cost = _measure(legacy, (), 3)
+    current_cost = _measure(current, (), 3)
+    print(f'{"impl":<24}{"params/s":>12}')
+    print(f'{"WereadParamsGenerate":<24}{count / legacy_cost:>12.0f}')
+    print(f'{"BookRequestSession":<24}{count / current_cost:>12.0f}')
+
+
+# ----------------------------
+# 网络：本地模拟服务器
+# ----------------------------
+class _MockResponse:
+
+    def __init__(self, status, body):
+        self.status = status
+        self.ok = 200 <= status < 300
+        self._body = body
+
+    async def text(self):
+        return self._body
+
+    async def json(self):
+        return json.loads(self._body)
+
+
+class MockPage:
+    """
+    用 aiohttp 模拟 page.request.post，把 weread.qq.com 的地址转发到本地模拟服务器
+    """
+
+    def __init__(self, session, base_url):
+        self.session = session
+        self.base_url = base_url
+        self.request = self
+
+    async def post(self, url, data=None, headers=None):
+        from mock_server import WEREAD_HOST
+        async with self.session.post(url.replace(WEREAD_HOST, self.base_url), data=data, headers=headers) as resp:
+            return _MockResponse(resp.status, await resp.text())
+
+
+async def _sequential_chapter_content(page, book, chapter_id, session):
+    """
+    改动前的顺序请求（对照组）
+    """
+    part_names = ['e_0', 'e_1', 'e_2', 'e_3'] if book['format'] == 'epub' else ['t_0', 't_1']
+    payload = json.dumps(session.get_request_param(chapter_id))
+    texts = []
+    for name in part_names:
+        response = await page.request.post(f'https://weread.qq.com/web/book/chapter/{name}', data=payload,
+                                           headers={"Content-Type": "application/json;charset=UTF-8"})
+        texts.append(await response.text())
+    return texts
+
+
+def bench_parts(chapters=40, latency=0.03):
+    import aiohttp
+    from mock_server import MockWeread, start_server
+
+    async def main():
+        mock = MockWeread(chapters=chapters, latency=latency)
+        runner, base_url = await start_server(mock)
+        book = {'bookId': '3300107269', 'format': 'epub'}
+        session = BookRequestSession(book['bookId'], 'psvts-sample', '1734400000')
+        try:
+            async with aiohttp.ClientSession() as http:
+                page = MockPage(http, base_url)
+                print(f'{chapters} 章 epub，单次请求延迟 {latency * 1000:.0f} ms')
+                print(f'{"mode":<12}{"total s":>10}{"ms/chapter":>12}')
+                for mode, fetch in (('sequential', _sequential_chapter_content),
+                                    ('concurrent', req_book_chapters_content)):
+                    start = time.perf_counter()
+                    for cid in mock.chapter_ids:
+                        texts = await fetch(page, book, cid, session)
+                        assert resolve_content(texts, book)[0] == mock.chapter_text(cid)
+                    cost = time.perf_counter() - start
+                    print(f'{mode:<12}{cost:>10.2f}{cost / chapters * 1000:>12.1f}')
+        finally:
+            await runner.cleanup()
+
+    asyncio.run(main())
+
+
+def bench_ratelimit(chapters=200, rate_limit=30, latency=0.03):
+    """
+    对比固定 DOWNLOAD_DELAY 与自适应限速：模拟服务器每秒最多处理 rate_limit 个请求，超出返回 429
+    """
+    import aiohttp
+    from mock_server import MockWeread, start_server
+    from rate_limiter import AdaptiveRateLimiter
+
+    book = {'bookId': '3300107269', 'format': 'epub'}
+    session = BookRequestSession(book['bookId'], 'psvts-sample', '1734400000')
+
+    async def download(page, mock, limiter, delay):
+        # 与 AsyncDownloadWorker 相同：DOWNLOAD_CONCURRENCY 个章节并发
+        from constants import DOWNLOAD_CONCURRENCY
+        window = asyncio.Semaphore(DOWNLOAD_CONCURRENCY)
+        failed = []
+
+        async def fetch(cid):
+            try:
+                texts = await req_book_chapters_content(page, book, cid, session, limiter=limiter)
+                assert resolve_content(texts, book)[0] == mock.chapter_text(cid)
+            except Exception:
+                failed.append(cid)
+            finally:
+                window.release()
+
+        tasks = []
+        for cid in mock.chapter_ids:
+            await window.acquire()
+            tasks.append(asyncio.create_task(fetch(cid)))
+            if delay:
+                await asyncio.sleep(delay)
+        await asyncio.gather(*tasks)
+        return failed
+
+    async def main():
+        # 被取消的分段请求会让模拟服务器打印连接断开，429 会打印「请求失败」，这里都不输出
+        logging.getLogger('aiohttp.server').setLevel(logging.CRITICAL)
+        print(f'{chapters} 章 epub，服务器限流 {rate_limit} 请求/秒，单次请求延迟 {latency * 1000:.0f} ms')
+        print(f'{"mode":<12}{"章/分钟":>10}{"429":>8}{"失败章节":>10}{"最终速率":>10}')
+        for mode, limiter, delay in (('fixed 0.1s', None, 0.1),
+                                     ('adaptive', AdaptiveRateLimiter(), 0)):
+            mock = MockWeread(chapters=chapters, latency=latency, rate_limit=rate_limit)
+            runner, base_url = await start_server(mock)
+            try:
+                async with aiohttp.ClientSession() as http:
+                    start = time.perf_counter()
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        failed = await download(MockPage(http, base_url), mock, limiter, delay)
+                    cost = time.perf_counter() - start
+            finally:
+                await runner.cleanup()
+            done = chapters - len(failed)
+            rate = f'{limiter.rate:.1f}' if limiter else '-'
+            print(f'{mode:<12}{done / cost * 60:>10.0f}{mock.throttled:>8}{len(failed):>10}{rate:>10}')
+
+    asyncio.run(main())
+
+
+def verify_retry_budget(chapters=200, error_rate=0.1):
+    """
+    长书 + 偶发错误：chapters 章共用一本书的 RetryBudget，模拟服务器按 error_rate 返回 503，所有章节都应下载完成
+    """
+    import aiohttp
+    from constants import DOWNLOAD_CONCURRENCY, RETRY_BUDGET
+    from mock_server import MockWeread, start_server
+    from retry_policy import RetryBudget, RetryPolicy
+
+    book = {'bookId': '3300107269', 'format': 'epub'}
+    session = BookRequestSession(book['bookId'], 'psvts-sample', '1734400000')
+
+    async def main():
+        logging.getLogger('aiohttp.server').setLevel(logging.CRITICAL)
+        mock = MockWeread(chapters=chapters, chapter_size=1024, latency=0, error_rate=error_rate)
+        runner, base_url = await start_server(mock)
+        budget = RetryBudget(RETRY_BUDGET)
+        # 与 AsyncDownloadWorker 相同的本书预算；缩短退避时间，放宽单个请求的尝试次数，只校验预算是否够用
+        retry = RetryPolicy('chapter', attempts=10, base_delay=0.01, max_delay=0.05, budget=budget)
+        window = asyncio.Semaphore(DOWNLOAD_CONCURRENCY)
+        failed = []
+
+        async def fetch(cid):
+            async with window:
+                try:
+                    texts = await req_book_chapters_content(page, book, cid, session, retry=retry)
+                    assert resolve_content(texts, book)[0] == mock.chapter_text(cid)
+                except Exception:
+                    failed.append(cid)
+
+        try:
+            async with aiohttp.ClientSession() as http:
+                page = MockPage(http, base_url)
+                with contextlib.redirect_stdout(io.StringIO()):
+                    await asyncio.gather(*[fetch(cid) for cid in mock.chapter_ids])
+        finally:
+            await runner.cleanup()
+        print(f'retry budget: {chapters} 章，{mock.errors} 次 503，重试 {budget.used}/{budget.limit} 次，'
+              f'失败 {len(failed)} 章')
+        return len(failed)
+
+    return asyncio.run(main())
+
+
+def verify_shelf_sync(size=20):
+    """
+    书架增量同步：syncBook 没有返回变化的书时，下次同步要重新请求，不能沿用本地旧数据
+    """
+    from mock_server import MockWeread, start_server
+    from shelf import sync_shelf_http
+    from shelf_index import ShelfIndex
+
+    async def main():
+        logging.getLogger('aiohttp.server').setLevel(logging.CRITICAL)
+        mock = MockWeread(latency=0, shelf_size=size)
+        runner, base_url = await start_server(mock)
+        cookies = [{'name': 'wr_vid', 'value': '1', 'domain': domain, 'path': '/', 'expires': -1,
+                    'httpOnly': True, 'secure': False, 'sameSite': 'Lax'}
+                   for domain in ('.weread.qq.com', '127.0.0.1')]
+        json.dump({'cookies': cookies, 'origins': []}, open('weread_state.json', 'w'))
+
+        async def sync():
+            with contextlib.redirect_stdout(io.StringIO()):
+                _, books, delta = await sync_shelf_http('weread_state.json', base_url)
+            return {book['bookId']: book for book in books}, delta
+
+        failed = 0
+        try:
+            await sync()
+            book_id = list(mock.shelf)[3]
+            mock.shelf[book_id]['updateTime'] = 2
+            mock.sync_missing.add(book_id)
+            books, delta = await sync()
+            if books[book_id]['updateTime'] != 1 or \
+                    ShelfIndex().diff(mock.shelf_indexes(), list(books.values()), 1).fetch != [book_id]:
+                failed += 1
+                print(f'FAIL shelf sync：更新失败的书 {book_id} 没有留给下次同步')
+
+            mock.sync_missing.clear()
+            books, delta = await sync()
+            if delta.fetch != [book_id] or books[book_id]['updateTime'] != 2:
+                failed += 1
+                print(f'FAIL shelf sync：{book_id} 没有重新请求（{delta}）')
+        finally:
+            await runner.cleanup()
+        print(f'shelf sync: {size} 本，更新失败后重新请求 {"ok" if not failed else "failed"}')
+        return failed
+
+    # sync_shelf 在当前目录读写书架文件
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        os.makedirs('images/cover', exist_ok=True)
+        try:
+            return asyncio.run(main())
+        finally:
+            os.chdir(cwd)
+
+
+class _PlaywrightPage:
+    """
+    playwright 的 APIRequestContext（即 page.request）转发到本地模拟服务器
+    """
+
+    def __init__(self, api, base_url):
+        self.api = api
+        self.base_url = base_url
+        self.request = self
+
+    async def post(self, url, data=None, headers=None):
+        from mock_server import WEREAD_HOST
+        return await self.api.post(url.replace(WEREAD_HOST, self.base_url), data=data, headers=headers)
+
+
+def bench_transport(chapters=200, latency=0.02, chapter_size=32 * 1024):
+    """
+    同一模拟服务器上对比 playwright page.request 与 CookieTransport（aiohttp 连接池），
+    模拟服务器要求携带 weread_state.json 中的 cookie
+    """
+    from playwright.async_api import async_playwright
+    from constants import DOWNLOAD_CONCURRENCY
+    from http_transport import CookieTransport
+    from mock_server import MockWeread, start_server
+
+    book = {'bookId': '3300107269', 'format': 'epub'}
+    session = BookRequestSession(book['bookId'], 'psvts-sample', '1734400000')
+    cookie = ('wr_skey', 'mock-skey')
+
+    async def download(page, mock):
+        window = asyncio.Semaphore(DOWNLOAD_CONCURRENCY)
+
+        async def fetch(cid):
+            async with window:
+                texts = await req_book_chapters_content(page, book, cid, session)
+                assert resolve_content(texts, book)[0] == mock.chapter_text(cid)
+
+        await asyncio.gather(*[fetch(cid) for cid in mock.chapter_ids])
+
+    async def main():
+        mock = MockWeread(chapters=chapters, chapter_size=chapter_size, latency=latency, require_cookie=cookie)
+        runner, base_url = await start_server(mock)
+        tmp = tempfile.mkdtemp()
+        storage = os.path.join(tmp, 'weread_state.json')
+        cookies = [{'name': cookie[0], 'value': cookie[1], 'domain': domain, 'path': '/', 'expires': -1,
+                    'httpOnly': True, 'secure': False, 'sameSite': 'Lax'}
+                   for domain in ('.weread.qq.com', '127.0.0.1')]
+        json.dump({'cookies': cookies, 'origins': []}, open(storage, 'w'))
+
+        print(f'{chapters} 章 epub（{chapter_size // 1024} KB/章），单次请求延迟 {latency * 1000:.0f} ms，'
+              f'每本书 {DOWNLOAD_CONCURRENCY} 章并发')
+        print(f'{"transport":<12}{"total s":>10}{"章/秒":>10}')
+        try:
+            async with async_playwright() as p:
+                api = await p.request.new_context(storage_state=storage)
+                start = time.perf_counter()
+                await download(_PlaywrightPage(api, base_url), mock)
+                cost = time.perf_counter() - start
+                await api.dispose()
+                print(f'{"playwright":<12}{cost:>10.2f}{chapters / cost:>10.1f}')
+
+            async with CookieTransport(storage, base_url=base_url) as http:
+                start = time.perf_counter()
+                await download(http, mock)
+                cost = time.perf_counter() - start
+                print(f'{"aiohttp":<12}{cost:>10.2f}{chapters / cost:>10.1f}')
+            assert mock.errors == 0, f'{mock.errors} 个请求未通过 cookie 校验'
+        finally:
+            await runner.cleanup()
+
+    asyncio.run(main())
+
+
+def bench_shelf(sizes=(1000, 5000), latency=0.05, error_rate=0.05):
+    """
+    书架同步：syncBook 逐批顺序请求 vs SHELF_SYNC_CONCURRENCY 批并发，模拟服务器按 error_rate 返回 503
+    """
+    from constants import SHELF_SYNC_CONCURRENCY
+    from http_transport import CookieTransport
+    from mock_server import MockWeread, start_server
+    from shelf import sync_books
+
+    async def main():
+        print(f'单次请求延迟 {latency * 1000:.0f} ms，{error_rate:.0%} 请求返回 503')
+        print(f'{"books":>8}{"concurrency":>14}{"requests":>10}{"total s":>10}')
+        for size in sizes:
+            for concurrency in (1, SHELF_SYNC_CONCURRENCY):
+                mock = MockWeread(latency=latency, error_rate=error_rate, shelf_size=size)
+                runner, base_url = await start_server(mock)
+                try:
+                    async with CookieTransport(storage=None, base_url=base_url) as http:
+                        start = time.perf_counter()
+                        with contextlib.redirect_stdout(io.StringIO()):
+                            books = await sync_books(http, list(mock.shelf), concurrency=concurrency)
+                        cost = time.perf_counter() - start
+                    assert [b['bookId'] for b in books] == list(mock.shelf)
+                    print(f'{size:>8}{concurrency:>14}{mock.requests:>10}{cost:>10.2f}')
+                finally:
+                    await runner.cleanup()
+
+    asyncio.run(main())
+
+
+def bench_library(books=1000, chapters=200):
+    """
+    下载状态查询：逐本读取清单 / 遍历章节目录（改动前的 set_book_is_download） vs 书库索引。
+    一半书有下载清单，一半是没有清单的旧版本下载
+    """
+    from book_manifest import BookManifest
+    from library_index import LibraryIndex
+
+    def legacy_status(book_dir, book_ids):
+        result = {}
+        for book_id in book_ids:
+            bp = book_dir / book_id
+            manifest = BookManifest.read(bp)
+            if manifest is not None:
+                result[book_id] = manifest.done
+            elif (bp / 'chapters').exists() and (bp / 'chapters.json').exists():
+                json.load((bp / 'chapters.json').open('r', encoding='utf8'))
+                result[book_id] = len(list((bp / 'chapters').iterdir()))
+        return result
+
+    tmp = Path(tempfile.mkdtemp())
+    book_dir = tmp / 'books'
+    book_ids = [f'{i:06d}' for i in range(books)]
+    for n, book_id in enumerate(book_ids):
+        bp = book_dir / book_id
+        (bp / 'chapters').mkdir(parents=True)
+        json.dump([{'chapterUid': c} for c in range(chapters)], (bp / 'chapters.json').open('w'))
+        for c in range(chapters):
+            (bp / 'chapters' / f'{c}.txt').write_text('x')
+        if n % 2:
+            manifest = BookManifest(bp)
+            manifest.set_total(chapters)
+            for c in range(chapters):
+                manifest.mark_done(c, 1, 'sha1')
+            manifest.save(force=True)
+
+    index = LibraryIndex(tmp / 'library.db', book_dir)
+    print(f'{books} 本书，每本 {chapters} 章')
+    print(f'{"method":<16}{"ms":>10}')
+    start = time.perf_counter()
+    expected = legacy_status(book_dir, book_ids)
+    print(f'{"scan":<16}{(time.perf_counter() - start) * 1000:>10.1f}')
+    start = time.perf_counter()
+    index.status_many(book_ids)
+    print(f'{"index (cold)":<16}{(time.perf_counter() - start) * 1000:>10.1f}')
+    start = time.perf_counter()
+    statuses = index.status_many(book_ids)
+    print(f'{"index (warm)":<16}{(time.perf_counter() - start) * 1000:>10.1f}')
+    start = time.perf_counter()
+    index.status(book_ids[-1])
+    print(f'{"index (1 book)":<16}{(time.perf_counter() - start) * 1000:>10.3f}')
+    assert {k: v['done'] for k, v in statuses.items()} == expected
+
+
+def bench_search(keyword='三体', repeat=3):
+    """
+    搜索延迟：每次启动浏览器（改动前 AsyncSearchWorker 的做法） vs 预热后的 browser_service。
+    需要联网和 CHROME_DIR 下的 Chromium
+    """
+    from playwright.async_api import async_playwright
+    from book_util import req_goto_search_page, req_search_books
+    from browser_service import BrowserService, SEARCH
+    from constants import CHROME_DIR
+
+    if not Path(CHROME_DIR).exists():
+        print(f'search: 找不到 {CHROME_DIR}，无法测量（需要 CHROME_DIR 下的 Chromium 和能访问 weread.qq.com 的网络）')
+        return
+
+    async def cold():
+        p = await async_playwright().start()
+        browser = await p.chromium.launch(headless=True, executable_path=CHROME_DIR)
+        context = await browser.new_context()
+        page = await context.new_page()
+        await req_goto_search_page(page)
+        await req_search_books(keyword, page)
+        await browser.close()
+        await p.stop()
+
+    service = BrowserService(headless=True)
+
+    async def warm():
+        page = await service.acquire_page(SEARCH)
+        try:
+            await req_goto_search_page(page, reuse=True)
+            await req_search_books(keyword, page)
+        finally:
+            await service.release_page(SEARCH, page)
+
+    print(f'搜索「{keyword}」，各 {repeat} 次')
+    print(f'{"mode":<12}{"first s":>10}{"avg s":>10}')
+    costs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        asyncio.run(cold())
+        costs.append(time.perf_counter() - start)
+    print(f'{"cold":<12}{costs[0]:>10.2f}{sum(costs) / repeat:>10.2f}')
+
+    service.warmup(search_page=req_goto_search_page).result()
+    costs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        service.run(warm())
+        costs.append(time.perf_counter() - start)
+    print(f'{"warm":<12}{costs[0]:>10.2f}{sum(costs) / repeat:>10.2f}')
+    service.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='book_util 基准测试')
+    parser.add_argument('target', choices=['corpus', 'verify', 'run', 'decode', 'params', 'stream', 'parts', 'ratelimit', 'transport', 'search',
+                                           'shelf', 'library'])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json', help='run: 保存结果到 JSON')
+    parser.add_argument('--compare', help='run: 与之前保存的 JSON 对比')
+    args = parser.parse_args()
+
+    if args.target == 'corpus':
+        record_corpus()
+    elif args.target == 'run':
+        run_suites(save=args.json, compare=args.compare)
+
+    elif args.target == 'decode':
+        bench_decode(args.repeat)
+    elif args.target == 'verify':
+        raise SystemExit(0 if verify() else 1)
+    elif args.target == 'params':
+        bench_params()
+    elif args.target == 'stream':
+        bench_stream()
+    elif args.target == 'parts':
+        bench_parts()
+    elif args.target == 'ratelimit':
+        bench_ratelimit()
+    elif args.target == 'transport':
+        bench_transport()
+    elif args.target == 'search':
+        bench_search()
+    elif args.target == 'shelf':
+        bench_shelf()
+    elif args.target == 'library':
+        bench_library()
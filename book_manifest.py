@@ -0,0 +1,144 @@
+'''
+单本书的下载清单 books/{bookId}/manifest.json
+
+{
+    "total": 章节总数,
+    "done": 已完成章节数,
+    "chapters": {
+        "<chapterUid>": {"state": "done", "size": 文件字节数, "sha1": 正文 sha1, "fetched_at": 时间戳}
+    }
+}
+
+断点续传、完整性判断和进度条只读清单，不再遍历 chapters 目录。
+章节文件先写临时文件再改名（ChapterDecoder.write_to），清单中 done 的章节文件一定是完整的；
+清单本身同样原子写入，下载过程中最多每 MANIFEST_FLUSH_INTERVAL 秒落盘一次。
+'''
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+from constants import MANIFEST_FLUSH_INTERVAL
+
+MANIFEST_NAME = 'manifest.json'
+PART_SUFFIX = '.part'
+
+DONE = 'done'
+
+
+def atomic_write_text(path, text):
+    '''
+    写入临时文件后替换，程序中途退出时不会留下半个文件
+    '''
+    atomic_write_bytes(path, text.encode('utf8'))
+
+
+def atomic_write_bytes(path, data):
+    tmp = f'{path}{PART_SUFFIX}'
+    try:
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+class BookManifest:
+
+    def __init__(self, book_dir, data=None):
+        self.book_dir = Path(book_dir)
+        self.path = self.book_dir / MANIFEST_NAME
+        data = data or {}
+        self.total = data.get('total', 0)
+        self.chapters = data.get('chapters', {})
+        self.done = sum(1 for c in self.chapters.values() if c.get('state') == DONE)
+        self.dirty = False
+        self.flushed = 0.0
+
+    @classmethod
+    def read(cls, book_dir):
+        '''
+        只读取已有清单，没有时返回 None
+        '''
+        path = Path(book_dir) / MANIFEST_NAME
+        if not path.exists():
+            return None
+        try:
+            return cls(book_dir, json.load(path.open(encoding='utf8')))
+        except (OSError, ValueError):
+            return None
+
+    @classmethod
+    def load(cls, book_dir):
+        '''
+        读取清单；旧版本下载的书没有清单，按 chapters 目录中已有的文件生成一份
+        '''
+        manifest = cls.read(book_dir)
+        if manifest is None:
+            manifest = cls(book_dir)
+            manifest.adopt(Path(book_dir) / 'chapters')
+        return manifest
+
+    def adopt(self, chapter_dir):
+        if not chapter_dir.exists():
+            return
+        for f in chapter_dir.iterdir():
+            if f.suffix == PART_SUFFIX:
+                f.unlink()
+                continue
+            data = f.read_bytes()
+            self._set(f.stem, os.path.getsize(f), hashlib.sha1(data.replace(b'\r\n', b'\n')).hexdigest(),
+                      os.path.getmtime(f))
+
+    def _set(self, chapter_id, size, sha1, fetched_at):
+        key = str(chapter_id)
+        if self.chapters.get(key, {}).get('state') != DONE:
+            self.done += 1
+        self.chapters[key] = {'state': DONE, 'size': size, 'sha1': sha1, 'fetched_at': int(fetched_at)}
+        self.dirty = True
+
+    def set_total(self, total):
+        if total != self.total:
+            self.total = total
+            self.dirty = True
+
+    def is_done(self, chapter_id, path: Path):
+        '''
+        清单中已完成，且文件大小一致（空章节不生成文件，大小为 0）
+        '''
+        entry = self.chapters.get(str(chapter_id))
+        if not entry or entry.get('state') != DONE:
+            return False
+        if entry['size'] == 0:
+            return True
+        try:
+            return path.stat().st_size == entry['size']
+        except OSError:
+            return False
+
+    def mark_done(self, chapter_id, size, sha1):
+        self._set(chapter_id, size, sha1, time.time())
+
+    @property
+    def complete(self):
+        return self.total > 0 and self.done >= self.total
+
+    def save(self, force=False):
+        '''
+        :param force: 忽略 MANIFEST_FLUSH_INTERVAL 立即写入（下载结束或失败时）
+        :return: 是否写入了文件
+        '''
+        if not self.dirty:
+            return False
+        now = time.monotonic()
+        if not force and now - self.flushed < MANIFEST_FLUSH_INTERVAL:
+            return False
+        self.book_dir.mkdir(parents=True, exist_ok=True)
+        data = {'total': self.total, 'done': self.done, 'chapters': self.chapters}
+        atomic_write_text(self.path, json.dumps(data, ensure_ascii=False))
+        self.dirty = False
+        self.flushed = now
+        return True
@@ -1,18 +1,61 @@
 import asyncio
 import base64
+import codecs
 import hashlib
 import json
 import os
 import re
 import time
-from pathlib import Path
+from functools import lru_cache
 from random import random
 
 import requests
 from bs4 import BeautifulSoup
 from playwright.async_api import BrowserContext, expect, Page
 
-from constants import COVER_DIR, BOOK_SHELF_PATH, LOCAL_BOOK_SHELF_PATH, FAV_BOOK_SHELF_PATH
+from constants import COVER_DIR, BOOK_SHELF_PATH, LOCAL_BOOK_SHELF_PATH, FAV_BOOK_SHELF_PATH, BOOK_HASH_CACHE_SIZE, \
+    DECODE_CHUNK_SIZE
+from book_manifest import PART_SUFFIX, atomic_write_bytes, atomic_write_text
+from library_index import library_index
+from retry_policy import RetryPolicy
+
+
+@lru_cache(maxsize=BOOK_HASH_CACHE_SIZE)
+def _book_hash(s: str):
+    # 1. MD5 哈希
+    h = hashlib.md5(s.encode()).hexdigest()
+
+    # 2. 前缀
+    result = h[:3]
+
+    # 3. 处理数字或字符
+    if s.isdigit():
+        chunks = [hex(int(s[i:i + 9]))[2:] for i in range(0, len(s), 9)]
+        type_flag = '3'
+    else:
+        chunks = [''.join([hex(ord(c))[2:] for c in s])]
+        type_flag = '4'
+
+    result += type_flag
+    result += '2' + h[-2:]
+
+    # 4. 拼接 chunks
+    for i, chunk in enumerate(chunks):
+        length_hex = hex(len(chunk))[2:]
+        if len(length_hex) == 1:
+            length_hex = '0' + length_hex
+        result += length_hex + chunk
+        if i < len(chunks) - 1:
+            result += 'g'
+
+    # 5. 补齐长度到20
+    if len(result) < 20:
+        result += h[:20 - len(result)]
+
+    # 6. 最终附加哈希前3位
+    result += hashlib.md5(result.encode()).hexdigest()[:3]
+
+    return result
 
 
 class WereadGenerate:
@@ -36,45 +79,15 @@ class WereadGenerate:
     def md5_hex(self, s):
         return hashlib.md5(s.encode()).hexdigest()
 
-    # book id、chapter id 生成算法
+    # book id、chapter id 生成算法（进程内 LRU 缓存，所有实例共享）
     def book_hash(self, s):
-        # 1. 转成字符串
-        s = str(s)
-
-        # 2. MD5 哈希
-        h = self.md5_hex(s)
-
-        # 3. 前缀
-        result = h[:3]
-
-        # 4. 处理数字或字符
-        if s.isdigit():
-            chunks = [hex(int(s[i:i + 9]))[2:] for i in range(0, len(s), 9)]
-            type_flag = '3'
-        else:
-            chunks = [''.join([hex(ord(c))[2:] for c in s])]
-            type_flag = '4'
+        return _book_hash(str(s))
 
-        result += type_flag
-        result += '2' + h[-2:]
-
-        # 5. 拼接 chunks
-        for i, chunk in enumerate(chunks):
-            length_hex = hex(len(chunk))[2:]
-            if len(length_hex) == 1:
-                length_hex = '0' + length_hex
-            result += length_hex + chunk
-            if i < len(chunks) - 1:
-                result += 'g'
-
-        # 6. 补齐长度到20
-        if len(result) < 20:
-            result += h[:20 - len(result)]
-
-        # 7. 最终附加哈希前3位
-        result += self.md5_hex(result)[:3]
-
-        return result
+    def book_hash_many(self, ids):
+        """
+        批量计算，顺序与 ids 一致
+        """
+        return [_book_hash(str(s)) for s in ids]
 
 
 class WereadParamsGenerate:
@@ -105,6 +118,47 @@ class WereadParamsGenerate:
         return book
 
 
+class BookRequestSession:
+    """
+    单本书下载期间复用的签名参数：b / pc / ps 以及签名串的固定部分只算一次，
+    每章只计算 c、ct、r 和签名 s
+    """
+
+    def __init__(self, book_id, psvts, pclts):
+        self.book_id = book_id
+        self.psvts = psvts
+        self.pclts = pclts
+        self.generate = WereadGenerate()
+
+        self.b = self.generate.book_hash(book_id)
+        self.pc = self.generate.book_hash(pclts)
+
+        # 签名串按 b, c, ct, pc, prevChapter, ps, r, sc, st 的顺序拼接
+        self._sign_head = f'b={self.b}&c='
+        self._sign_middle = f'&pc={self.pc}&prevChapter=false&ps={psvts}&r='
+        self._sign_tail = f'&sc={0x0}&st={0x0}'
+
+    def get_request_param(self, chapter_id):
+        c = self.generate.book_hash(chapter_id)
+        ct = f'{int(time.time())}'
+        r = f'{int(10000 * random()) ** 2}'
+
+        s = f'{self._sign_head}{c}&ct={ct}{self._sign_middle}{r}{self._sign_tail}'
+
+        return {
+            'b': self.b,
+            'c': c,
+            'ct': ct,
+            'pc': self.pc,
+            'prevChapter': 'false',
+            'ps': self.psvts,
+            'r': r,
+            'sc': 0x0,
+            'st': 0x0,
+            's': self.generate._0x58fb1d(s),
+        }
+
+
 def parser_chapter_info(html, levels=[]) -> dict:
     #     document.querySelectorAll('.readerCatalog_list > li')
 
@@ -177,10 +231,15 @@ WR_SEARCH_BAR_INPUT_SELECTOR = ".wr_index_page_search_bar_input"
 WR_SEARCH_ACTION_ICON_SELECTOR = ".wr_index_page_search_bar_action_icon"
 SEARCH_API_URL_PARTIAL = "/api/store/search"
 
-async def req_goto_search_page(page, url="https://weread.qq.com"):
+async def req_goto_search_page(page, url="https://weread.qq.com", reuse=False):
     """
     步骤 1: 创建新页面并导航到微信读书首页。
+    :param reuse: 复用的页面已在首页且搜索框可见时不再重新加载
     """
+    if reuse and page.url.startswith(url) and await page.locator(WR_SEARCH_BAR_INPUT_SELECTOR).is_visible():
+        print("-> 复用已打开的搜索页")
+        return
+
     print(f"-> 导航到 URL: {url}")
     try:
         # page = await context.new_page()
@@ -245,7 +304,7 @@ async def req_search_books(keyword, page: Page):
         # 检查响应状态码
         if search_response.status != 200:
             print(f"API 响应失败，状态码: {search_response.status}")
-            return None
+            return None, None, None
 
         # 解析 JSON 响应体
         search_results = await search_response.json()
@@ -269,7 +328,25 @@ async def req_search_books(keyword, page: Page):
         return None, None, None
 
 
-async def req_book_chapters(page, book):
+async def _limited_post(request, limiter, url, **kwargs):
+    """
+    经过限速器的 request.post，请求结果和耗时反馈给限速器
+    """
+    if limiter is None:
+        return await request.post(url, **kwargs)
+
+    await limiter.acquire()
+    start = time.monotonic()
+    try:
+        response = await request.post(url, **kwargs)
+    except Exception:
+        limiter.record(False, time.monotonic() - start)
+        raise
+    limiter.record(response.ok, time.monotonic() - start)
+    return response
+
+
+async def req_book_chapters(page, book, limiter=None, retry: RetryPolicy = None):
     # 使用 page.request.post 创建请求对象
     request = page.request
     headers = {
@@ -281,22 +358,24 @@ async def req_book_chapters(page, book):
 
     url = 'https://weread.qq.com/web/book/chapterInfos'
     # url = 'https://weread.qq.com/web/book/publicchapterInfos'
-    response = await request.post(url, data=json.dumps(payload), headers=headers)
+    retry = retry or RetryPolicy('chapterInfos')
+    response = await retry.run(
+        lambda: _limited_post(request, limiter, url, data=json.dumps(payload), headers=headers))
 
-    if response.ok:
-        data = await response.json()
-
-        return data['data'][0]['updated']
-    else:
-        print("请求失败:", response.status)
+    data = await response.json()
+    return data['data'][0]['updated']
 
 
-async def req_book_chapters_content(page, book, chapter_id, psvts, pclts):
+async def req_book_chapters_content(page, book, chapter_id, session: BookRequestSession, on_part=None,
+                                    limiter=None, retry: RetryPolicy = None):
+    '''
+    :param on_part: 可选回调 on_part(index, text)，分段到达即交给调用方（如 ChapterDecoder.feed），不再保留在列表中
+    :param limiter: 可选 AdaptiveRateLimiter，每个分段请求前取令牌
+    :param retry: 重试策略，下载整本书时传入带本书 RetryBudget 的策略
+    :return: 未传 on_part 时返回全部分段文本
+    '''
     # 请求接口
     book_type = book['format']
-    book_id = book['bookId']
-
-    gen = WereadParamsGenerate(book_id, chapter_id, psvts, pclts)
 
     if book_type == 'epub':
         urls = [
@@ -311,7 +390,7 @@ async def req_book_chapters_content(page, book, chapter_id, psvts, pclts):
             "https://weread.qq.com/web/book/chapter/t_1",
         ]
 
-    payload = gen.get_request_param()
+    payload = session.get_request_param(chapter_id)
 
     # 使用 page.request.post 创建请求对象
     request = page.request
@@ -321,24 +400,31 @@ async def req_book_chapters_content(page, book, chapter_id, psvts, pclts):
     }
 
     # print("请求体：", payload)
-    texts = []
-    for url in urls:
-        retry = 0
-        while True:
-            response = await request.post(url, data=json.dumps(payload), headers=headers, )
+    data = json.dumps(payload)
 
-            if response.ok:
-                text = await response.text()
-                texts.append(text)
-                break
-            else:
-                print("请求失败:", response.status)
-                retry = retry + 1
+    retry = retry or RetryPolicy('chapter')
 
-                if retry > 3:
-                    raise Exception(r'网络请求失败，稍后再试。')
+    async def fetch_part(index, url):
+        # 每个分段独立重试
+        response = await retry.run(lambda: _limited_post(request, limiter, url, data=data, headers=headers, ))
 
-    return texts
+        text = await response.text()
+        if on_part:
+            # 交给调用方后不再持有
+            on_part(index, text)
+            return None
+        return text
+
+    # 各分段请求体相同，并发请求；任一分段最终失败时取消其余分段
+    tasks = [asyncio.create_task(fetch_part(index, url)) for index, url in enumerate(urls)]
+    try:
+        texts = await asyncio.gather(*tasks)
+    except BaseException:
+        for t in tasks:
+            t.cancel()
+        raise
+
+    return None if on_part else texts
 
 async def req_add_book_shelf():
 
@@ -366,75 +452,231 @@ def resolve_content(texts, book, ):
         return _resolve_content(texts), None
 
 
-def _resolve_content(texts):
-    t = "".join(s[32:] for s in texts)
-    t = t[1:]
+# 双重 UTF-8 编码（mojibake）修复：匹配被当成 latin-1 字符解出来的多字节序列
+UTF8_MOJIBAKE_PATTERN = re.compile(r'[\xC0-\xDF][\x80-\xBF]|[\xE0-\xEF][\x80-\xBF]{2}|[\xF0-\xF7][\x80-\xBF]{3}')
+ASTRAL_PATTERN = re.compile('[\U00010000-\U0010FFFF]')
+NON_BASE64_PATTERN = re.compile(rb'[^A-Za-z0-9+/]')
 
-    def a(s: str):
-        length = len(s)
-        if length < 4:
-            return []
-        if length < 11:
-            return [0, 2]
-
-        n = min(4, -(-length // 10))  # ceil(length / 10)
-        tmp = ""
-        for i in range(length - 1, length - 1 - n, -1):
-            tmp += str(int(bin(ord(s[i]))[2:], 4))
-
-        arr = []
-        m = length - n - 2
-        step = len(str(m))
-
-        i = 0
-        while len(arr) < 10 and i + step < len(tmp):
-            v = int(tmp[i:i + step])
-            arr.append(v % m)
-            v2 = int(tmp[i + 1:i + 1 + step])
-            arr.append(v2 % m)
-            i += step
-        return arr
-
-    def b(s: str, arr):
-        chars = list(s)
-        for i in range(len(arr) - 1, -1, -2):
-            for k in (1, 0):
-                idx1 = arr[i] + k
-                idx2 = arr[i - 1] + k
-                chars[idx1], chars[idx2] = chars[idx2], chars[idx1]
-        return "".join(chars)
-
-    # def base64_url_to_base64(s: str):
-    #     s = s.replace("-", "+").replace("_", "/")
-    #     return re.sub(r"[^A-Za-z0-9+/]", "", s)
-
-    def replace_utf8(m: re.Match):
-        chunk = m.group(0)
-        l = len(chunk)
-        if l == 4:
-            val = ((ord(chunk[0]) & 0x7) << 18) | ((ord(chunk[1]) & 0x3F) << 12) | ((ord(chunk[2]) & 0x3F) << 6) | (
-                    ord(chunk[3]) & 0x3F)
-            val -= 0x10000
-            return chr(0xD800 + (val >> 10)) + chr(0xDC00 + (val & 0x3FF))
-        elif l == 3:
-            return chr(((ord(chunk[0]) & 0xF) << 12) | ((ord(chunk[1]) & 0x3F) << 6) | (ord(chunk[2]) & 0x3F))
-        else:
-            return chr(((ord(chunk[0]) & 0x1F) << 6) | (ord(chunk[1]) & 0x3F))
+
+def _shuffle_index(buf):
+    """
+    根据密文末尾几个字节计算交换下标（原 a() 函数）
+    :param buf: bytes / bytearray
+    """
+    length = len(buf)
+    if length < 4:
+        return []
+    if length < 11:
+        return [0, 2]
+
+    n = min(4, -(-length // 10))  # ceil(length / 10)
+    tmp = "".join([str(int(bin(buf[i])[2:], 4)) for i in range(length - 1, length - 1 - n, -1)])
+
+    arr = []
+    m = length - n - 2
+    step = len(str(m))
+
+    i = 0
+    while len(arr) < 10 and i + step < len(tmp):
+        v = int(tmp[i:i + step])
+        arr.append(v % m)
+        v2 = int(tmp[i + 1:i + 1 + step])
+        arr.append(v2 % m)
+        i += step
+    return arr
+
+
+def _unshuffle(buf: bytearray, arr):
+    """
+    原地还原被交换的字节（原 b() 函数），不再生成 list(str)
+    """
+    for i in range(len(arr) - 1, -1, -2):
+        for k in (1, 0):
+            idx1 = arr[i] + k
+            idx2 = arr[i - 1] + k
+            buf[idx1], buf[idx2] = buf[idx2], buf[idx1]
+
+
+def _replace_utf8(m: re.Match):
+    chunk = m.group(0)
+    l = len(chunk)
+    if l == 4:
+        val = ((ord(chunk[0]) & 0x7) << 18) | ((ord(chunk[1]) & 0x3F) << 12) | ((ord(chunk[2]) & 0x3F) << 6) | (
+                ord(chunk[3]) & 0x3F)
+        val -= 0x10000
+        return chr(0xD800 + (val >> 10)) + chr(0xDC00 + (val & 0x3FF))
+    elif l == 3:
+        return chr(((ord(chunk[0]) & 0xF) << 12) | ((ord(chunk[1]) & 0x3F) << 6) | (ord(chunk[2]) & 0x3F))
+    else:
+        return chr(((ord(chunk[0]) & 0x1F) << 6) | (ord(chunk[1]) & 0x3F))
+
+
+def _decode_text(data: bytes) -> str:
+    """
+    把 base64 解出来的字节还原成文本，结果与「decode(errors="ignore") + 正则修复」完全一致
+    """
+    # 1. 只有 \xC3 开头的序列才能解出 U+00C0~U+00F7，没有它正则不可能命中，直接解码
+    if b'\xc3' not in data:
+        return data.decode(errors="ignore")
+
+    text = data.decode(errors="ignore")
+    if not UTF8_MOJIBAKE_PATTERN.search(text):
+        return text
+
+    # 2. 整章双重编码：用编解码器一次还原
+    #    严格解码成功说明每个多字节序列都会被正则原样命中；4 字节序列原实现输出代理对，交给兜底处理
+    try:
+        repaired = text.encode('latin-1').decode('utf8')
+        if not ASTRAL_PATTERN.search(repaired):
+            return repaired
+    except UnicodeError:
+        pass
+
+    # 3. 兜底：中英混排、非法序列等，逐段修复
+    return UTF8_MOJIBAKE_PATTERN.sub(_replace_utf8, text)
+
+
+def _join_payload(texts) -> bytearray:
+    """
+    拼接各分段响应（去掉 32 位前缀），再去掉首字符，全程只保留一份 bytearray
+    """
+    buf = bytearray()
+    for s in texts:
+        # 密文只包含 base64 字符，非 ASCII 时与原实现一样抛出 ValueError
+        buf += s[32:].encode('ascii')
+    del buf[:1]
+    return buf
+
+
+def _resolve_content(texts):
+    buf = _join_payload(texts)
 
     # === 执行 ===
-    arr = a(t)
-    encodeStr = b(t, arr)
+    _unshuffle(buf, _shuffle_index(buf))
 
     # Base64 解码
-    decoded_bytes = base64.b64decode(encodeStr)
-    text = decoded_bytes.decode(errors="ignore")
+    decoded_bytes = base64.b64decode(buf)
 
-    # 进一步修复 UTF-8 编码
-    pattern = re.compile(r'[\xC0-\xDF][\x80-\xBF]|[\xE0-\xEF][\x80-\xBF]{2}|[\xF0-\xF7][\x80-\xBF]{3}')
-    text = pattern.sub(replace_utf8, text)
+    # 解码并按需修复 UTF-8 编码
+    return _decode_text(decoded_bytes)
+
+class ChapterDecoder:
+    """
+    流式解码单个章节：分段响应到达即追加进同一个 bytearray（不再保留 texts 列表），
+    最后按 DECODE_CHUNK_SIZE 分块 base64 / UTF-8 解码并直接写入章节文件。
+
+    峰值内存 ≈ 密文长度 + 一个分块，可通过 buffered_bytes / peak_chunk_bytes 观测。
+    """
+
+    # 正文对应的分段：epub 的 e_2 是样式，不参与正文
+    CONTENT_PARTS = {'epub': (0, 1, 3), 'txt': (0, 1)}
+
+    def __init__(self, book, chunk_size=DECODE_CHUNK_SIZE):
+        self.parts = self.CONTENT_PARTS['epub' if book['format'] == 'epub' else 'txt']
+        # 分块必须是 4 的倍数，保证每块都能独立 base64 解码
+        self.chunk_size = max(4, chunk_size - chunk_size % 4)
+        self.buf = bytearray()
+        self.pending = {}
+        self.next_part = 0
+        # 拼接后的首字符不是密文
+        self._skip = 1
+        self.peak_chunk_bytes = 0
+
+    @property
+    def buffered_bytes(self):
+        return len(self.buf)
+
+    def feed(self, index, text):
+        """
+        接收第 index 段响应，可乱序到达，按正文顺序拼接
+        """
+        if index not in self.parts:
+            return
+        self.pending[index] = text
+        while self.next_part < len(self.parts) and self.parts[self.next_part] in self.pending:
+            part = self.pending.pop(self.parts[self.next_part])
+            self.buf += part[32:].encode('ascii')
+            if self._skip and self.buf:
+                del self.buf[:1]
+                self._skip = 0
+            self.next_part += 1
+
+    def _chunks(self):
+        """
+        逐块解码，遇到需要修复的双重编码内容时抛出 _NeedFullDecode
+        """
+        data = memoryview(self.buf)
+        decoder = codecs.getincrementaldecoder('utf8')(errors="ignore")
+        for start in range(0, len(data), self.chunk_size):
+            raw = base64.b64decode(data[start:start + self.chunk_size])
+            if b'\xc3' in raw:
+                raise _NeedFullDecode()
+            self.peak_chunk_bytes = max(self.peak_chunk_bytes, len(raw))
+            yield decoder.decode(raw)
+        yield decoder.decode(b'', final=True)
+
+    def _streamable(self):
+        # 分块解码要求密文只含 base64 字符，'=' 只能出现在末尾；其余情况与原实现一样整体解码
+        end = len(self.buf)
+        while end and self.buf[end - 1] == ord('=') and len(self.buf) - end < 2:
+            end -= 1
+        return len(self.buf) % 4 == 0 and NON_BASE64_PATTERN.search(self.buf, 0, end) is None
+
+    def write_to(self, path):
+        """
+        还原并写入 path：先写 path.part 再改名，中途退出不会留下不完整的章节文件。内容为空时不创建文件
+        :return: {'size': 文件字节数, 'sha1': 正文 sha1}，供 BookManifest 记录
+        """
+        if self.next_part != len(self.parts):
+            raise ValueError(f'章节分段不完整：{self.next_part}/{len(self.parts)}')
+
+        _unshuffle(self.buf, _shuffle_index(self.buf))
+
+        tmp = f'{path}{PART_SUFFIX}'
+        sha1 = hashlib.sha1()
+        f = None
+        try:
+            streamed = False
+            if self._streamable():
+                try:
+                    for chunk in self._chunks():
+                        if chunk:
+                            f = f or open(tmp, 'w', encoding='utf8')
+                            f.write(chunk)
+                            sha1.update(chunk.encode('utf8', 'surrogatepass'))
+                    streamed = True
+                except _NeedFullDecode:
+                    if f:
+                        f.seek(0)
+                        f.truncate()
+                    sha1 = hashlib.sha1()
+
+            if not streamed:
+                # 兜底：整体解码（含双重编码修复），结果与 _resolve_content 一致
+                text = _decode_text(base64.b64decode(self.buf))
+                if text:
+                    f = f or open(tmp, 'w', encoding='utf8')
+                    f.write(text)
+                    sha1.update(text.encode('utf8', 'surrogatepass'))
+
+            if f is None:
+                return {'size': 0, 'sha1': sha1.hexdigest()}
+            f.close()
+            os.replace(tmp, path)
+            return {'size': os.path.getsize(path), 'sha1': sha1.hexdigest()}
+        except BaseException:
+            if f:
+                f.close()
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        finally:
+            self.buf = bytearray()
+
+
+class _NeedFullDecode(Exception):
+    pass
 
-    # print(text)
-    return text
 
 def load_my_books():
     '''
@@ -452,6 +694,12 @@ def load_my_books():
 
     return books
 
+def save_my_books(books):
+    '''
+    保存微信书架信息（包含已计算的 bookHash）
+    '''
+    atomic_write_text(BOOK_SHELF_PATH, json.dumps(books, ensure_ascii=False, indent=4))
+
 def load_local_books():
     '''
     加载本地书架信息
@@ -477,8 +725,8 @@ def load_fav_books():
     return []
 
 def download_img(book):
-    img_url = book["cover"]
-    if not img_url:
+    img_url = book.get("cover")
+    if not img_url or not book.get("bookHash"):
         return
 
     ext = os.path.splitext(img_url)[1].split("?")[0]  # 保留 jpg/png
@@ -490,42 +738,43 @@ def download_img(book):
         # tasks.append(download_image(img_url, filename))
 
         try:
-            resp = requests.get(img_url)
-            if resp.status_code == 200:
-                data = resp.content
-                with open(filename, "wb") as f:
-                    f.write(data)
-                print("已保存:", filename)
-            else:
-                print("下载失败:", img_url)
+            # 封面不影响下载：只请求一次，不退避重试，失败时下次下载再补
+            resp = RetryPolicy('cover', attempts=1).run_sync(lambda: requests.get(img_url, timeout=10))
+            atomic_write_bytes(filename, resp.content)
+            print("已保存:", filename)
         except Exception as e:
             print("下载异常:", e, img_url)
 
 
+def fill_book_hash(books):
+    '''
+    补齐缺失的 bookHash
+    :return: 是否有新计算的 bookHash（调用方据此决定是否回写书架 JSON）
+    '''
+    missing = [book for book in books if not book.get('bookHash')]
+    hashes = WereadGenerate().book_hash_many(book['bookId'] for book in missing)
+    for book, h in zip(missing, hashes):
+        book['bookHash'] = h
+    return bool(missing)
+
+
 def set_book_is_download(books):
+    '''
+    :return: 是否有新计算的 bookHash
+    '''
     # local_path = Path('books')
-    book_util = WereadGenerate()
+    changed = fill_book_hash(books)
+    # 下载状态从书库索引读取，目录没有变化时不再读取清单或遍历章节目录
+    statuses = library_index.status_many(book['bookId'] for book in books)
+    # 不在这里下载封面：调用方可能在 GUI 线程，封面由同步书架 / 下载线程在后台补齐
     for book in books:
+        status = statuses.get(str(book['bookId']))
+        if status is not None:
+            book['progress'] = status['done']
+            book['is_download'] = status['complete']
+            book['chapter_size'] = status['total']
 
-        if not book.get('bookHash'):
-            book['bookHash'] = book_util.book_hash(book['bookId'])
-
-        download_img(book)
-
-
-        bp = Path(f'books/{book["bookId"]}')
-
-        chapter_path = bp / Path(f'chapters')
-        chapter_info_path = bp / Path(f'chapters.json')
-
-        if chapter_path.exists() and chapter_info_path.exists():
-            chapter_infos = json.load(chapter_info_path.open('r', encoding='utf8'))
-            size = len(chapter_infos)
-            chapter_size = len(list(chapter_path.iterdir()))
-            book['progress'] = chapter_size
-            book['is_download'] = size == chapter_size
-            book['chapter_size'] = size
-
+    return changed
 
 
 if __name__ == '__main__':
@@ -0,0 +1,186 @@
+'''
+整个应用共用的浏览器服务：一个 Playwright 驱动、一个 Chromium，随应用启动预热，退出时关闭
+
+Playwright 的对象只能在创建它的事件循环中使用，服务自带一个后台线程运行事件循环，
+登录、搜索、下载的协程都提交到这个循环执行：
+
+    browser_service.run(login_weread())        # QThread.run 中阻塞等待
+    future = browser_service.submit(coro)      # 不等待，返回 concurrent.futures.Future
+
+协程内部通过 context() / search_context() 获取共享的 context，通过 acquire_page / release_page 复用页面。
+'''
+import asyncio
+import threading
+import traceback
+
+from playwright.async_api import async_playwright
+
+from constants import STORAGE, CHROME_DIR, BROWSER_HEADLESS, BROWSER_PAGE_POOL
+
+SESSION = 'session'    # 携带登录会话（STORAGE）的 context：登录、下载
+SEARCH = 'search'    # 不带会话的 context：搜索
+
+
+class BrowserService:
+
+    def __init__(self, headless=BROWSER_HEADLESS, page_pool=BROWSER_PAGE_POOL):
+        self.headless = headless
+        self.page_pool = page_pool
+
+        self.loop = None
+        self.thread = None
+        self.ready = threading.Event()
+        self.start_lock = threading.Lock()
+
+        self.playwright = None
+        self._browser = None
+        self._contexts = {}
+        self._pages = {SESSION: [], SEARCH: []}
+        self._lock = None
+
+    # ---------- 线程与事件循环 ----------
+
+    def start(self):
+        with self.start_lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run_loop, name='browser-service', daemon=True)
+                self.thread.start()
+        self.ready.wait()
+        return self
+
+    def _run_loop(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self._lock = asyncio.Lock()
+        self.ready.set()
+        self.loop.run_forever()
+
+    def submit(self, coro):
+        self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro):
+        """
+        在服务的事件循环中执行 coro 并阻塞等待结果，供 QThread.run 使用
+        """
+        return self.submit(coro).result()
+
+    def warmup(self, search_page=None):
+        """
+        后台启动浏览器并创建 context；传入 search_page(page) 协程函数时预先打开一个搜索页放入页面池
+        """
+
+        async def task():
+            try:
+                await self.context()
+                if search_page:
+                    page = await self.acquire_page(SEARCH)
+                    await search_page(page)
+                    await self.release_page(SEARCH, page)
+                print('浏览器预热完成')
+            except Exception:
+                traceback.print_exc()
+
+        return self.submit(task())
+
+    def stop(self):
+        if self.thread is None:
+            return
+        try:
+            self.submit(self._close()).result(timeout=10)
+        except Exception:
+            traceback.print_exc()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=5)
+
+    # ---------- 以下方法须在服务的事件循环中调用 ----------
+
+    async def browser(self):
+        async with self._lock:
+            if self._browser is None or not self._browser.is_connected():
+                if self.playwright is None:
+                    self.playwright = await async_playwright().start()
+                self._browser = await self.playwright.chromium.launch(headless=self.headless,
+                                                                      executable_path=CHROME_DIR)
+                self._contexts.clear()
+                self._pages = {SESSION: [], SEARCH: []}
+            return self._browser
+
+    async def context(self, kind=SESSION):
+        browser = await self.browser()
+        async with self._lock:
+            if kind not in self._contexts:
+                if kind == SESSION:
+                    # 如果已经有会话文件，加载它
+                    try:
+                        self._contexts[kind] = await browser.new_context(storage_state=STORAGE)
+                        print("加载已有会话:", STORAGE)
+                    except Exception:
+                        traceback.print_exc()
+                        self._contexts[kind] = await browser.new_context()
+                        print("创建新会话")
+                else:
+                    self._contexts[kind] = await browser.new_context()
+            return self._contexts[kind]
+
+    async def search_context(self):
+        return await self.context(SEARCH)
+
+    async def reload_session(self):
+        """
+        STORAGE 更新后（如重新扫码登录）重新创建会话 context，旧 context 的页面一并关闭
+        """
+        async with self._lock:
+            context = self._contexts.pop(SESSION, None)
+            self._pages[SESSION] = []
+        if context:
+            await context.close()
+        return await self.context(SESSION)
+
+    async def acquire_page(self, kind=SESSION):
+        pages = self._pages[kind]
+        while pages:
+            page = pages.pop()
+            if not page.is_closed():
+                return page
+        context = await self.context(kind)
+        return await context.new_page()
+
+    async def release_page(self, kind, page):
+        """
+        页面放回池中，池满或页面已关闭时关闭
+        """
+        if page.is_closed():
+            return
+        if len(self._pages[kind]) < self.page_pool and page.context is self._contexts.get(kind):
+            self._pages[kind].append(page)
+        else:
+            await page.close()
+
+    async def launch_interactive(self):
+        """
+        扫码登录需要可见的窗口：服务为无头模式时单独启动一个有界面的浏览器，用完由调用方关闭
+        :return: (browser, context)
+        """
+        await self.browser()
+        if not self.headless:
+            return None, await self.context(SESSION)
+        browser = await self.playwright.chromium.launch(headless=False, executable_path=CHROME_DIR)
+        return browser, await browser.new_context()
+
+    async def _close(self):
+        for context in list(self._contexts.values()):
+            try:
+                await context.close()
+            except Exception:
+                pass
+        self._contexts.clear()
+        if self._browser:
+            await self._browser.close()
+            self._browser = None
+        if self.playwright:
+            await self.playwright.stop()
+            self.playwright = None
+
+
+browser_service = BrowserService()
@@ -2,8 +2,11 @@ import asyncio
 import json
 import os
 import sys
+import threading
 import time
 import traceback
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from pathlib import Path
 from typing import Dict, Any
 
@@ -22,14 +25,22 @@ from PySide6.QtWidgets import (
 from PySide6.QtWidgets import (
     QWidget,
     QLabel,
-    QProgressBar,
 )
 
 from text_to_epub import EpubBuilder, MarkdownBuilder, PdfBuilder
 from book_util import set_book_is_download, req_book_page, req_book_chapters, parser_script, parser_chapter_info, \
-    req_book_chapters_content, resolve_content, load_my_books, req_goto_search_page, req_search_books
-from shelf import login_weread, load_browser, load_search_browser
-from constants import DOWNLOAD_DELAY, BOOK_DIR, STORAGE
+    req_book_chapters_content, load_my_books, req_goto_search_page, req_search_books, save_my_books, \
+    BookRequestSession, ChapterDecoder, download_img
+from book_manifest import BookManifest
+from library_index import library_index
+from browser_service import browser_service, SESSION, SEARCH
+from search_client import search_client, SearchSessionExpired
+from http_transport import CookieTransport
+from rate_limiter import AdaptiveRateLimiter
+from retry_policy import RetryPolicy, RetryBudget, retry_snapshot
+from shelf import login_weread, load_browser, sync_shelf_http
+from constants import BOOK_DIR, STORAGE, DECODE_EXECUTOR, DECODE_WORKERS, DECODE_QUEUE_SIZE, \
+    DOWNLOAD_CONCURRENCY, DOWNLOAD_BOOKS, DOWNLOAD_MAX_INFLIGHT, RETRY_BUDGET, DOWNLOAD_TRANSPORT
 
 
 class ExportDialog(QDialog):
@@ -321,17 +332,28 @@ class LoginAsyncWorker(QThread):
 
     books_signal = Signal(list)
 
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # 本次同步的书架变化（ShelfDelta）和用户信息，失败时为 None
+        self.delta = None
+        self.user_data = None
+
     def run(self):
         """在工作线程中执行阻塞的 asyncio.run"""
         # 注意：虽然这一行会阻塞这个 QThread，但它不会阻塞 UI 主线程
         try:
-            # 实际调用您的异步函数
-            asyncio.run(login_weread())
+            # 会话有效时直接请求接口同步，失效时才打开浏览器扫码登录
+            result = browser_service.run(sync_shelf_http())
+            if result is None:
+                result = browser_service.run(login_weread())
+            user_data, _, self.delta = result
+            self.user_data = dict(user_data)
 
             # 如果 login_weread 返回数据，可以在这里保存到 self.result 并通过 Signal 传递
             books = load_my_books()
 
-            set_book_is_download(books)
+            if set_book_is_download(books):
+                save_my_books(books)
 
             self.books_signal.emit(books)
 
@@ -341,6 +363,153 @@ class LoginAsyncWorker(QThread):
             # 可以在这里发射一个带有错误信息的信号
 
 
+def create_decode_executor():
+    """
+    章节解码 / 写盘用的执行器，类型和大小见 constants.DECODE_EXECUTOR / DECODE_WORKERS
+    """
+    if DECODE_EXECUTOR == 'process':
+        return ProcessPoolExecutor(max_workers=DECODE_WORKERS)
+    return ThreadPoolExecutor(max_workers=DECODE_WORKERS, thread_name_prefix='chapter-decode')
+
+
+class ChapterPersistStage:
+    """
+    抓取 -> 解码写盘 两级流水线中的写盘阶段。
+
+    解码和写文件在执行器中完成，不占用驱动 Playwright 的事件循环，下一章的请求与上一章的解码并行；
+    每本书最多 workers 章同时在执行器中解码写盘。队列有界，写盘跟不上时抓取端自动等待。
+    章节可能乱序落盘，进度以 saved 计数为准，保证单调。
+    """
+
+    def __init__(self, executor, on_saved, maxsize=DECODE_QUEUE_SIZE, workers=DECODE_WORKERS):
+        """
+        :param on_saved: on_saved(index, result)，result 为 ChapterDecoder.write_to 的返回值，本地已有的章节为 None
+        """
+        self.executor = executor
+        self.on_saved = on_saved
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.window = asyncio.Semaphore(workers)
+        self.writing = set()
+        self.saved = 0
+        self.error = None
+        self._task = asyncio.create_task(self._run())
+
+    async def put(self, index, decoder, path):
+        """
+        :param decoder: None 表示章节已在本地，只推进进度
+        """
+        if self.error:
+            raise self.error
+        await self.queue.put((index, decoder, path))
+
+    async def close(self):
+        """
+        等待已入队的章节全部落盘
+        """
+        await self.queue.put(None)
+        await self._task
+        if self.error:
+            raise self.error
+
+    def cancel(self):
+        self._task.cancel()
+        for task in list(self.writing):
+            task.cancel()
+
+    def _done(self, index, result):
+        self.saved += 1
+        self.on_saved(index, result)
+
+    async def _write(self, index, decoder, path):
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self.executor, decoder.write_to, path)
+            if not self.error:
+                self._done(index, result)
+        except Exception as e:
+            traceback.print_exc()
+            self.error = self.error or e
+        finally:
+            self.window.release()
+
+    async def _run(self):
+        try:
+            while True:
+                item = await self.queue.get()
+                if item is None:
+                    return
+                # 出错后继续取空队列，避免抓取端阻塞在 put 上
+                if self.error:
+                    continue
+
+                index, decoder, path = item
+                if decoder is None:
+                    try:
+                        self._done(index, None)
+                    except Exception as e:
+                        traceback.print_exc()
+                        self.error = e
+                    continue
+
+                # 最多 workers 章同时解码写盘
+                await self.window.acquire()
+                task = asyncio.create_task(self._write(index, decoder, path))
+                self.writing.add(task)
+                task.add_done_callback(self.writing.discard)
+        finally:
+            if self.writing:
+                await asyncio.gather(*self.writing, return_exceptions=True)
+
+
+class RoundRobinSlots:
+    """
+    多本书共享的章节请求名额：全局最多 limit 个章节在途。
+    名额不足时按书轮转分配，拿到名额的书排到队尾，慢书或大书不会饿死其他书。
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.inflight = 0
+        self.waiters = OrderedDict()  # key -> deque[Future]
+
+    async def acquire(self, key):
+        if self.inflight < self.limit and not self.waiters:
+            self.inflight += 1
+            return
+
+        fut = asyncio.get_running_loop().create_future()
+        self.waiters.setdefault(key, deque()).append(fut)
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # 已分配名额但调用方被取消，归还
+                self.release()
+            else:
+                queue = self.waiters.get(key)
+                if queue and fut in queue:
+                    queue.remove(fut)
+                    if not queue:
+                        del self.waiters[key]
+            raise
+
+    def release(self):
+        self.inflight -= 1
+        self._wake()
+
+    def _wake(self):
+        while self.inflight < self.limit and self.waiters:
+            key, queue = next(iter(self.waiters.items()))
+            fut = queue.popleft()
+            # 轮转：本次分配后该书排到最后
+            del self.waiters[key]
+            if queue:
+                self.waiters[key] = queue
+            if fut.done():
+                continue
+            self.inflight += 1
+            fut.set_result(None)
+
+
 # =========================================
 # ★ 下载线程（不阻塞 UI）
 # =========================================
@@ -361,109 +530,221 @@ class AsyncDownloadWorker(QThread):
         self.paused = True
         self.running = False
         self.book_ids = set()
-        self.tasks = []
+        self.executor = None
+        self.slots = None
+        # 所有 page 共享的自适应限速，取代固定的 DOWNLOAD_DELAY
+        self.limiter = AdaptiveRateLimiter()
+        # DOWNLOAD_TRANSPORT 为 http 时，章节接口不经过浏览器
+        self.http = None
+        self.active_books = set()
+
+        # 待下载队列：事件循环启动前 add_task 的书先放在 pending，启动后转入 queue
+        self.loop = None
+        self.queue = None
+        self.pending = []
+        self.lock = threading.Lock()
 
     async def task(self):
 
-        p, b, context = await load_browser()
-        while True:
-            if not self.tasks:
-                time.sleep(2)
-            else:
-                book = self.tasks.pop(0)
+        self.queue = asyncio.Queue()
+        with self.lock:
+            self.loop = asyncio.get_running_loop()
+            for book in self.pending:
+                self.queue.put_nowait(book)
+            self.pending.clear()
 
-                self.running = True
-                self.paused = False
+        self.executor = create_decode_executor()
+        if DOWNLOAD_TRANSPORT == 'http':
+            self.http = await CookieTransport().open()
+        self.slots = RoundRobinSlots(DOWNLOAD_MAX_INFLIGHT)
 
-                page = await context.new_page()
-                total = 0
-                curr_index = 0
-                try:
-                    self.progress.emit(0, "开始下载...", 0, 0, book)
+        # DOWNLOAD_BOOKS 本书同时下载，每本书使用共享 context 中自己的 page
+        await asyncio.gather(*[self.book_runner() for _ in range(DOWNLOAD_BOOKS)])
 
-                    book_id = book['bookId']
-
-                    html = await req_book_page(page, book)
-
-                    chapter_infos = await req_book_chapters(page, book)
-                    levels = list(set([c.get('level', 1) for c in chapter_infos]))
-
-                    book_info = parser_script(html)
-                    chapters = parser_chapter_info(html, levels)
+    async def book_runner(self):
+        while True:
+            book = await self.queue.get()
+            try:
+                # 每本书开始时重新获取，重新登录后 browser_service 会换成新的 context
+                p, b, context = await load_browser()
+                await self.download_book(context, book)
+            finally:
+                self.queue.task_done()
+
+    async def download_book(self, context, book):
+        book_id = book['bookId']
+        # 没有其他书在下载时才重置状态，避免新书开始时把其他书的暂停取消
+        if not self.active_books:
+            self.running = True
+            self.paused = False
+        self.active_books.add(book_id)
+
+        page = await browser_service.acquire_page(SESSION)
+        total = 0
+        curr_index = 0
+        stage = None
+        manifest = None
+        fetching = set()
+        # 本书所有请求共用一份重试预算
+        budget = RetryBudget(RETRY_BUDGET)
+        try:
+            self.progress.emit(0, "开始下载...", 0, 0, book)
 
-                    if not book.get('format'):
-                        new_book = book_info['reader']['bookInfo']
-                        book['format'] = new_book['format']
-                        book['language'] = new_book['language']
-                        self.update_book_signal.emit(book,)
+            # 书架外的书（搜索添加）同步书架时不会下载封面，与阅读页请求一起在后台补齐
+            html, _ = await asyncio.gather(req_book_page(page, book), asyncio.to_thread(download_img, book))
 
-                    book_info_path = BOOK_DIR / Path(f'{book_id}/info.json')
-                    chapter_infos_path = BOOK_DIR / Path(f'{book_id}/chapters.json')
-                    chapter_dir = Path(BOOK_DIR / Path(f'{book_id}')) / Path('chapters')
+            # 浏览器只负责打开阅读页（psvts 和最新的 cookie），接口请求交给 requester
+            requester = page
+            if self.http:
+                self.http.load_cookies(await context.cookies())
+                requester = self.http
 
-                    Path(BOOK_DIR / Path(f'{book_id}')).mkdir(exist_ok=True, parents=True)
-                    chapter_dir.mkdir(exist_ok=True, parents=True)
+            chapter_infos = await req_book_chapters(requester, book, limiter=self.limiter,
+                                                    retry=RetryPolicy('chapterInfos', budget=budget))
+            levels = list(set([c.get('level', 1) for c in chapter_infos]))
 
-                    Path(BOOK_DIR / Path(f'{book_id}/{book["title"]}')).open('w', encoding='utf8').write('')
+            book_info = parser_script(html)
+            chapters = parser_chapter_info(html, levels)
 
-                    psvts = book_info['reader']['psvts']
-                    pclts = f'{int(time.time())}'
+            if not book.get('format'):
+                new_book = book_info['reader']['bookInfo']
+                book['format'] = new_book['format']
+                book['language'] = new_book['language']
+                self.update_book_signal.emit(book,)
 
-                    total = len(chapter_infos)
+            book_info_path = BOOK_DIR / Path(f'{book_id}/info.json')
+            chapter_infos_path = BOOK_DIR / Path(f'{book_id}/chapters.json')
+            chapter_dir = Path(BOOK_DIR / Path(f'{book_id}')) / Path('chapters')
 
-                    self.chapterTotal.emit(0, total, book)
+            Path(BOOK_DIR / Path(f'{book_id}')).mkdir(exist_ok=True, parents=True)
+            chapter_dir.mkdir(exist_ok=True, parents=True)
 
-                    json.dump(book, book_info_path.open('w', encoding='utf8'), ensure_ascii=False, indent=4)
-                    json.dump(chapter_infos, chapter_infos_path.open('w', encoding='utf8'), ensure_ascii=False,
-                              indent=4)
+            Path(BOOK_DIR / Path(f'{book_id}/{book["title"]}')).open('w', encoding='utf8').write('')
 
-                    for i, chapter in enumerate(chapter_infos):
-                        if not self.running:
-                            break
+            psvts = book_info['reader']['psvts']
+            pclts = f'{int(time.time())}'
+            session = BookRequestSession(book_id, psvts, pclts)
+            chapter_retry = RetryPolicy('chapter', budget=budget)
 
-                        curr_index = i
+            total = len(chapter_infos)
 
-                        if chapters[max(i - 1, 0)]['is_lock']:
-                            raise Exception(f'下载失败 - 没有阅读权限...')
+            self.chapterTotal.emit(0, total, book)
 
-                        chapter_id = chapter["chapterUid"]
+            json.dump(book, book_info_path.open('w', encoding='utf8'), ensure_ascii=False, indent=4)
+            json.dump(chapter_infos, chapter_infos_path.open('w', encoding='utf8'), ensure_ascii=False,
+                      indent=4)
 
-                        ext = '.xhtml' if book['format'] == 'epub' else '.txt'
-                        chapter_path = chapter_dir / Path(f'{chapter_id}{ext}')
-                        if not chapter_path.exists():
-                            texts = await req_book_chapters_content(
-                                page,
-                                book,
-                                chapter_id,
-                                psvts,
-                                pclts
-                            )
-                            content, css = resolve_content(texts, book, )
+            # 断点续传以清单为准；旧版本下载的书首次加载时要读取已有文件，放到线程中
+            manifest = await asyncio.to_thread(BookManifest.load, BOOK_DIR / Path(f'{book_id}'))
+            manifest.set_total(total)
 
-                            if content:
-                                chapter_path.open('w', encoding='utf8').write(content)
-                                # print(f'保存章节：{chapter_path}')
+            # 章节乱序完成，进度按已落盘的章节数上报，保证单调
+            def on_saved(i, result):
+                if result is not None:
+                    manifest.mark_done(chapter_infos[i]['chapterUid'], **result)
+                    # 清单落盘时同步更新书库索引，下载中途退出时索引也不落后于清单
+                    if manifest.save():
+                        library_index.record(book_id, manifest)
+                success = 1 if stage.saved == total else 0
+                # msg 附带当前限速，便于观察
+                rate = f'{self.limiter.rate:.1f} 请求/秒'
+                self.progress.emit(success, rate, min(stage.saved, total), total, book)
 
-                        success = 1 if (i + 1) == total else 0
-                        self.progress.emit(success, '', min(i + 1, total), total, book)
+            stage = ChapterPersistStage(self.executor, on_saved)
 
-                        # 暂停逻辑
-                        while self.paused:
-                            self.progress.emit(2, f"暂停中…", i + 1, total, book)
-                            await asyncio.sleep(1)
+            # 同一本书最多 DOWNLOAD_CONCURRENCY 个章节同时请求
+            window = asyncio.Semaphore(DOWNLOAD_CONCURRENCY)
+            fetching = set()
+            errors = []
 
-                        await asyncio.sleep(DOWNLOAD_DELAY)
+            async def fetch_chapter(i, chapter_id, chapter_path):
+                try:
+                    # 分段到达即送入解码器，解码写盘交给 ChapterPersistStage
+                    decoder = ChapterDecoder(book)
+                    await req_book_chapters_content(
+                        requester,
+                        book,
+                        chapter_id,
+                        session,
+                        on_part=decoder.feed,
+                        limiter=self.limiter,
+                        retry=chapter_retry,
+                    )
+                    await stage.put(i, decoder, chapter_path)
                 except Exception as e:
-                    self.progress.emit(-1, f'{e}', curr_index + 1, total, book)
-                    traceback.print_exc()
-                finally:
-                    # 保存会话到文件
-                    await context.storage_state(path=STORAGE)
-                    await page.close()
+                    errors.append(e)
+
+            def release_slot(task):
+                # 放在 done callback 里：任务未开始就被取消时也能归还名额
+                fetching.discard(task)
+                self.slots.release()
+                window.release()
+
+            for i, chapter in enumerate(chapter_infos):
+                if not self.running:
+                    break
+
+                curr_index = i
+
+                if chapters[max(i - 1, 0)]['is_lock']:
+                    raise Exception(f'下载失败 - 没有阅读权限...')
+
+                chapter_id = chapter["chapterUid"]
+
+                ext = '.xhtml' if book['format'] == 'epub' else '.txt'
+                chapter_path = chapter_dir / Path(f'{chapter_id}{ext}')
+                if manifest.is_done(chapter_id, chapter_path):
+                    await stage.put(i, None, chapter_path)
+                else:
+                    # 先占本书的窗口，再按轮转顺序占全局名额
+                    await window.acquire()
+                    try:
+                        await self.slots.acquire(book_id)
+                    except BaseException:
+                        window.release()
+                        raise
+                    if errors:
+                        self.slots.release()
+                        window.release()
+                        raise errors[0]
+                    t = asyncio.create_task(fetch_chapter(i, chapter_id, chapter_path))
+                    fetching.add(t)
+                    t.add_done_callback(release_slot)
+
+                # 暂停逻辑：不再发起新请求，已发出的请求继续完成
+                while self.paused:
+                    self.progress.emit(2, f"暂停中…", stage.saved, total, book)
+                    await asyncio.sleep(1)
+
+            # 停止或全部发出后，等待在途章节完成
+            if fetching:
+                await asyncio.gather(*fetching)
+            if errors:
+                raise errors[0]
+
+            await stage.close()
+        except Exception as e:
+            for t in list(fetching):
+                t.cancel()
+            if stage:
+                # 失败位置以已落盘的章节为准
+                curr_index = min(curr_index, stage.saved)
+                stage.cancel()
+            self.progress.emit(-1, f'{e}', curr_index + 1, total, book)
+            traceback.print_exc()
+        finally:
+            if manifest:
+                manifest.save(force=True)
+                library_index.record(book_id, manifest)
+            print(f'{book_id} 重试 {budget.used}/{budget.limit} 次，累计：{retry_snapshot()}')
+            self.active_books.discard(book_id)
+            # 保存会话到文件
+            await context.storage_state(path=STORAGE)
+            await browser_service.release_page(SESSION, page)
 
     def run(self):
-
-        asyncio.run(self.task())
+        # 在共享浏览器的事件循环中运行，本线程只等待
+        browser_service.run(self.task())
 
 
     def add_task(self, book):
@@ -472,7 +753,12 @@ class AsyncDownloadWorker(QThread):
             self.book_ids.add(book_id)
 
             if not book.get('is_download'):
-                self.tasks.append(book)
+                # add_task 在 GUI 线程调用，通过 call_soon_threadsafe 交给下载线程的事件循环
+                with self.lock:
+                    if self.loop is None:
+                        self.pending.append(book)
+                        return
+                self.loop.call_soon_threadsafe(self.queue.put_nowait, book)
 
 
     # --- 暂停与继续 ---
@@ -490,28 +776,73 @@ class AsyncDownloadWorker(QThread):
 
 
 class AsyncSearchWorker(QThread):
+    """
+    搜索与翻页：优先用 search_client 直接请求接口；没有可用会话时通过浏览器搜索一次，捕获 sid 和请求头
+    """
 
     results_signal = Signal(str, dict, dict)
+    failed_signal = Signal(str)
 
-    def __init__(self, query, /):
+    def __init__(self, query, scope=None, max_idx=None, /):
         super().__init__()
-        self.browser = None
         self.query = query
+        # 翻页参数，首次搜索为 None
+        self.scope = scope
+        self.max_idx = max_idx
+        self.future = None
+        self.cancelled = False
 
-    def run(self):
-        async def task():
-            p, browser, context = await load_search_browser()
-            self.browser = (p, browser, context)
-            page = await context.new_page()
-            await req_goto_search_page(page)
+    def cancel(self):
+        """
+        取消尚未完成的请求（新的搜索开始时取消旧的预取），取消后不再发出信号
+        """
+        self.cancelled = True
+        if self.future:
+            self.future.cancel()
+
+    async def browser_search(self):
+        # 复用预热好的搜索页，已在首页时不再重新加载
+        page = await browser_service.acquire_page(SEARCH)
+        try:
+            await req_goto_search_page(page, reuse=True)
 
             url, headers, results = await req_search_books(self.query, page, )
-            if results:
-                self.results_signal.emit(url, headers, results)
+            if url:
+                search_client.capture(url, headers)
+            return url, headers, results
+        finally:
+            await browser_service.release_page(SEARCH, page)
 
-            await browser.close()
+    async def task(self):
+        try:
+            url, results = await search_client.search(self.query, self.scope, self.max_idx)
+            return url, search_client.headers, results
+        except SearchSessionExpired as e:
+            print(f'{e}，改用浏览器搜索')
 
-        asyncio.run(task())
+        url, headers, results = await self.browser_search()
+        if self.scope is not None and search_client.ready:
+            # 翻页：浏览器只用来获取新的会话，结果仍按 scope / maxIdx 请求
+            url, results = await search_client.search(self.query, self.scope, self.max_idx)
+        return url, headers, results
+
+    def run(self):
+        if self.cancelled:
+            return
+        try:
+            self.future = browser_service.submit(self.task())
+            url, headers, results = self.future.result()
+            if self.cancelled:
+                return
+            if results:
+                self.results_signal.emit(url, headers, results)
+            else:
+                self.failed_signal.emit('未获取到搜索结果')
+        except Exception as e:
+            if self.cancelled:
+                return
+            traceback.print_exc()
+            self.failed_signal.emit(f'搜索失败：{e}')
 
 
 class ImageDownloader(QObject):
@@ -586,75 +917,6 @@ class ImageDownloader(QObject):
         reply.deleteLater()
 
 
-# --- 1. 定义工作线程 (执行耗时任务) ---
-class DataLoadWorker(QThread):
-
-    def __init__(self, books, /):
-        super().__init__()
-        self.books = books
-        print("--- DataLoadWindow __init__ 被调用 ---")  # 👈 添加这个
-
-    def run(self):
-        """模拟一个耗时的数据加载任务"""
-        print("Worker: 正在开始加载数据...")
-
-        set_book_is_download(self.books)
-        print("Worker: 数据加载完成。")
-
-
-class DataLoadWindow(QWidget):
-
-    loaded_signal = Signal(bool)
-
-    def __init__(self, is_init=True):
-        super().__init__()
-        self.books = []
-        self.resize(250, 100)
-        self.setWindowTitle("数据加载中")
-
-        self.layout = QVBoxLayout(self)
-        self.layout.addWidget(QLabel("正在等待数据加载..."))
-
-        bar = QProgressBar()
-        bar.setValue(0)
-        bar.setMaximum(0)
-        bar.setVisible(True)
-
-        self.layout.addWidget(bar)
-
-        self.show()
-        # asyncio.run(login_weread())  # 如果需要
-        if is_init:
-            self.login_worker = LoginAsyncWorker()
-            self.login_worker.books_signal.connect(self.init_async)
-            self.login_worker.start()
-        else:
-            self.init_async(self.books)
-
-
-    def init_async(self, books):
-        """
-        开始异步任务，并显示加载弹框。
-        """
-        self.books = books
-        self.worker = DataLoadWorker(self.books)
-        # 链接工作线程的完成信号到主线程的槽函数
-        self.worker.finished.connect(self.on_data_load_finished)
-
-        print("--- init_async 被调用，启动 Worker ---")  # 👈 添加这个
-        self.worker.start()  # 启动工作线程
-
-    def on_data_load_finished(self):
-        """
-        数据加载完成时调用的槽函数。
-        """
-        print("主线程: 接收到完成信号。")
-
-        self.close()
-
-        self.loaded_signal.emit(True)
-
-
 class ClickableLabel(QLabel):
 
     clicked = Signal()  # 自定义点击信号
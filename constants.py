@@ -12,7 +12,52 @@ WKHTMLTOPDF_DIR = LIB_DIR / Path(r'wkhtmltox/bin/wkhtmltopdf.exe')
 
 STORAGE = "weread_state.json"
 
-DOWNLOAD_DELAY = 0.1
+# 共享浏览器（browser_service.py）
+BROWSER_HEADLESS = True    # 无头模式；扫码登录时会单独打开有界面的窗口
+BROWSER_PAGE_POOL = 4    # 每个 context 保留的空闲页面数
+SEARCH_SESSION_PATH = 'search_session.json'    # 浏览器搜索时捕获的 sid 和请求头，之后直接请求搜索接口
+SEARCH_PAGE_SIZE = 20    # 搜索翻页每页条数
+SEARCH_CACHE_PATH = 'search_cache.db'    # 搜索结果缓存（search_cache.py，SQLite）
+SEARCH_CACHE_TTL = 10 * 60    # 缓存在该时间（秒）内直接使用，超过后先显示再后台刷新
+SEARCH_CACHE_MAX_AGE = 7 * 24 * 3600    # 超过该时间（秒）的缓存丢弃
+SEARCH_CACHE_SIZE = 200    # 最多缓存的结果页数，按最近使用淘汰
+SEARCH_PREFETCH_DEPTH = 1    # 当前页显示后预取之后几页（含封面）
+
+# 下载请求自适应限速（rate_limiter.py），单位：请求/秒
+RATE_INITIAL = 8    # 初始速率
+RATE_MIN = 1    # 最低速率
+RATE_MAX = 50    # 最高速率
+RATE_INCREASE = 1    # 响应正常时每秒增加的速率
+RATE_DECREASE = 0.7    # 429 / 5xx 或延迟升高时速率乘以该系数
+RATE_BURST = 4    # 令牌桶容量，允许一个 epub 章节的分段同时发出
+RATE_LATENCY_FACTOR = 2.0    # 平均延迟超过基线的倍数视为拥塞
+RATE_COOLDOWN = 1.0    # 两次降速的最小间隔（秒）
+# 章节请求方式：http 使用 aiohttp 连接池并携带浏览器会话的 cookie（http_transport.py），browser 使用 page.request
+DOWNLOAD_TRANSPORT = 'http'
+HTTP_POOL_LIMIT = 32    # 连接池总连接数
+HTTP_POOL_PER_HOST = 16    # 单个域名的连接数
+HTTP_TIMEOUT = 30    # 单次请求超时（秒）
+SESSION_CHECK_TIMEOUT = 5    # 启动时检查会话是否有效的请求超时（秒），失败时走浏览器登录
+HTTP_USER_AGENT = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) '
+                   'Chrome/131.0.0.0 Safari/537.36')
+DOWNLOAD_CONCURRENCY = 4    # 单本书同时请求的章节数
+DOWNLOAD_BOOKS = 3    # 同时下载的书籍数
+DOWNLOAD_MAX_INFLIGHT = 8    # 所有书合计的在途章节请求上限
+# 请求重试（retry_policy.py）
+RETRY_ATTEMPTS = 5    # 单个请求最多尝试次数（含第一次），与原实现失败后重试 4 次相同
+RETRY_BASE_DELAY = 0.5    # 退避基数（秒），第 n 次重试最多等待 base * 2^n
+RETRY_MAX_DELAY = 10    # 单次退避上限（秒）
+RETRY_BUDGET = 50    # 每本书所有请求起始的重试次数
+RETRY_BUDGET_RATIO = 0.2    # 每个成功的请求为本书增加的重试次数，长书可用的重试随章节数增加
+SHELF_SYNC_BATCH = 50    # 每个 syncBook 请求的书籍数
+SHELF_SYNC_CONCURRENCY = 4    # 同时请求的 syncBook 批次数
+COVER_CONCURRENCY = 8    # 同步书架时同时下载的封面数
+BOOK_HASH_CACHE_SIZE = 4096    # book_hash 的 LRU 缓存条数
+DECODE_CHUNK_SIZE = 256 * 1024    # 章节流式解码的分块大小（字节）
+DECODE_EXECUTOR = 'thread'    # 章节解码写盘的执行器：thread / process
+DECODE_WORKERS = 2    # 解码写盘的线程（进程）数
+DECODE_QUEUE_SIZE = 4    # 抓取与写盘之间的队列长度，写盘跟不上时抓取等待
+MANIFEST_FLUSH_INTERVAL = 2    # 下载中 books/{bookId}/manifest.json 的最短写入间隔（秒）
 COVER_DIR = "images/cover"
 BOOK_DIR = Path("books")
 
@@ -22,3 +67,5 @@ BOOK_DIR.mkdir(exist_ok=True, parents=True)
 BOOK_SHELF_PATH = 'book_shelf.json'    # 微信书架电子书保存目录
 LOCAL_BOOK_SHELF_PATH = 'local_book_shelf.json'    # 本地下载保存目录
 FAV_BOOK_SHELF_PATH = 'fav_book_shelf.json'    # 本地收藏的保存目录
+SHELF_INDEX_PATH = 'shelf_index.json'    # 上次同步的书架索引（每本书的更新标记），刷新时只请求新增和变化的书
+LIBRARY_INDEX_PATH = 'library.db'    # 本地书库下载状态索引（SQLite），按目录 mtime 校验，不再每次遍历章节目录
@@ -0,0 +1,123 @@
+'''
+不经过浏览器的 HTTP 请求：从 weread_state.json（STORAGE）读取 cookie，用 aiohttp 连接池发送请求
+
+接口与 playwright 的 page.request 一致（post 返回带 ok / status / text() / json() 的响应），
+可以直接替换 req_book_chapters / req_book_chapters_content 的 page 参数：
+
+    async with CookieTransport() as http:
+        chapter_infos = await req_book_chapters(http, book)
+
+浏览器只用于登录和获取 psvts。
+'''
+import json
+import os
+from http.cookies import Morsel
+
+import aiohttp
+from yarl import URL
+
+from constants import STORAGE, HTTP_POOL_LIMIT, HTTP_POOL_PER_HOST, HTTP_TIMEOUT, HTTP_USER_AGENT
+
+WEREAD_HOST = 'https://weread.qq.com'
+
+
+class HttpResponse:
+    """
+    响应体在连接归还连接池前已读完
+    """
+
+    def __init__(self, status, body: bytes, headers):
+        self.status = status
+        self.ok = 200 <= status < 300
+        self.headers = headers
+        self.body = body
+
+    async def text(self):
+        return self.body.decode('utf8')
+
+    async def json(self):
+        return json.loads(self.body)
+
+
+class CookieTransport:
+
+    def __init__(self, storage=STORAGE, base_url=None, limit=HTTP_POOL_LIMIT, limit_per_host=HTTP_POOL_PER_HOST,
+                 timeout=HTTP_TIMEOUT):
+        '''
+        :param base_url: 测试用，把 weread.qq.com 的请求转发到该地址（如本地模拟服务器）
+        '''
+        self.storage = storage
+        self.base_url = base_url
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.timeout = timeout
+        self.session = None
+        self.jar = None
+        # 与 page.request 用法一致：request = page.request
+        self.request = self
+
+    async def open(self):
+        # 模拟服务器是 IP 地址，需要 unsafe 才会接收和发送 cookie
+        self.jar = aiohttp.CookieJar(unsafe=self.base_url is not None)
+        if self.storage and os.path.exists(self.storage):
+            state = json.load(open(self.storage, encoding='utf8'))
+            self.load_cookies(state.get('cookies', []))
+
+        connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host,
+                                         keepalive_timeout=60)
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            cookie_jar=self.jar,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            headers={
+                'User-Agent': HTTP_USER_AGENT,
+                'Referer': f'{WEREAD_HOST}/',
+                'Origin': WEREAD_HOST,
+            },
+        )
+        return self
+
+    async def close(self):
+        if self.session:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self):
+        return await self.open()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def load_cookies(self, cookies):
+        '''
+        :param cookies: storage_state 中的 cookies，或 context.cookies() 的返回值
+        '''
+        for c in cookies:
+            domain = c['domain'].lstrip('.')
+            morsel = Morsel()
+            morsel.set(c['name'], c['value'], c['value'])
+            morsel['domain'] = c['domain']
+            morsel['path'] = c.get('path') or '/'
+            if c.get('secure'):
+                morsel['secure'] = True
+            if c.get('httpOnly'):
+                morsel['httponly'] = True
+            self.jar.update_cookies({c['name']: morsel}, URL(f'https://{domain}/'))
+            if self.base_url:
+                # 模拟服务器地址下同样带上 cookie
+                self.jar.update_cookies({c['name']: c['value']}, URL(self.base_url))
+
+    def _url(self, url):
+        if self.base_url and url.startswith(WEREAD_HOST):
+            return self.base_url + url[len(WEREAD_HOST):]
+        return url
+
+    async def post(self, url, data=None, headers=None):
+        async with self.session.post(self._url(url), data=data, headers=headers) as resp:
+            body = await resp.read()
+            return HttpResponse(resp.status, body, resp.headers)
+
+    async def get(self, url, headers=None):
+        async with self.session.get(self._url(url), headers=headers) as resp:
+            body = await resp.read()
+            return HttpResponse(resp.status, body, resp.headers)
@@ -0,0 +1,121 @@
+'''
+本地书库的下载状态索引 LIBRARY_INDEX_PATH（SQLite）
+
+每本书一行：章节总数、已下载章节数、是否下载完成，以及记录时 books/{bookId} 和其 chapters 目录的 mtime。
+查询时只 stat 两个目录，mtime 与记录一致直接返回；不一致（或没有记录）时才读取下载清单 / 遍历章节目录，
+并更新记录。下载线程在每本书结束时调用 record 写入最新状态。
+
+可在多个线程中使用。
+'''
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+from book_manifest import BookManifest, PART_SUFFIX
+from constants import LIBRARY_INDEX_PATH, BOOK_DIR
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS books (
+    book_id TEXT PRIMARY KEY,
+    total INTEGER NOT NULL,
+    done INTEGER NOT NULL,
+    complete INTEGER NOT NULL,
+    dir_mtime INTEGER NOT NULL,
+    chapters_mtime INTEGER NOT NULL
+)
+'''
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return 0
+
+
+class LibraryIndex:
+
+    def __init__(self, path=LIBRARY_INDEX_PATH, book_dir=BOOK_DIR):
+        self.path = path
+        self.book_dir = Path(book_dir)
+        self.lock = threading.Lock()
+        self._conn = None
+
+    @property
+    def conn(self):
+        # 第一次查询时才打开（创建）数据库，导入模块不在当前目录产生文件；调用方已持有 self.lock
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            with self._conn:
+                self._conn.execute(SCHEMA)
+        return self._conn
+
+    def _mtimes(self, book_id):
+        bp = self.book_dir / book_id
+        return _mtime(bp), _mtime(bp / 'chapters')
+
+    def _scan(self, book_id):
+        '''
+        :return: (total, done)，没有下载过时返回 None
+        '''
+        bp = self.book_dir / book_id
+        manifest = BookManifest.read(bp)
+        if manifest is not None:
+            return manifest.total, manifest.done
+
+        # 旧版本下载的书没有清单
+        chapter_path = bp / 'chapters'
+        chapter_info_path = bp / 'chapters.json'
+        if chapter_path.exists() and chapter_info_path.exists():
+            chapter_infos = json.load(chapter_info_path.open('r', encoding='utf8'))
+            done = sum(1 for f in chapter_path.iterdir() if f.suffix != PART_SUFFIX)
+            return len(chapter_infos), done
+        return None
+
+    def _put(self, book_id, total, done, mtimes):
+        self.conn.execute('INSERT OR REPLACE INTO books VALUES (?, ?, ?, ?, ?, ?)',
+                          (book_id, total, done, int(total > 0 and done >= total), *mtimes))
+
+    def status_many(self, book_ids):
+        '''
+        :return: {bookId: {'total', 'done', 'complete'}}，没有下载过的书不在结果中
+        '''
+        result = {}
+        with self.lock, self.conn:
+            for book_id in map(str, book_ids):
+                mtimes = self._mtimes(book_id)
+                if not mtimes[0]:
+                    self.conn.execute('DELETE FROM books WHERE book_id = ?', (book_id,))
+                    continue
+
+                row = self.conn.execute('SELECT total, done, complete, dir_mtime, chapters_mtime FROM books '
+                                        'WHERE book_id = ?', (book_id,)).fetchone()
+                if row and tuple(row[3:]) == mtimes:
+                    total, done, complete = row[:3]
+                else:
+                    # 目录有变化：重新读取，mtime 取读取前的值，读取期间的变化留给下一次查询
+                    scanned = self._scan(book_id)
+                    if scanned is None:
+                        self.conn.execute('DELETE FROM books WHERE book_id = ?', (book_id,))
+                        continue
+                    total, done = scanned
+                    complete = total > 0 and done >= total
+                    self._put(book_id, total, done, mtimes)
+                result[book_id] = {'total': total, 'done': done, 'complete': bool(complete)}
+        return result
+
+    def status(self, book_id):
+        return self.status_many([book_id]).get(str(book_id))
+
+    def record(self, book_id, manifest: BookManifest):
+        '''
+        下载结束、清单落盘后写入最新状态
+        '''
+        book_id = str(book_id)
+        with self.lock, self.conn:
+            self._put(book_id, manifest.total, manifest.done, self._mtimes(book_id))
+
+
+library_index = LibraryIndex()
@@ -0,0 +1,201 @@
+'''
+本地模拟的 weread 接口，供 benchmark.py 在没有登录、没有浏览器的情况下测试网络相关的改动
+
+python mock_server.py --port 8765 --latency 0.05 --error-rate 0.1
+
+可注入延迟和错误状态码（429 / 5xx），也可模拟服务器限流（--rate-limit，超过每秒请求数返回 429），
+章节内容由 benchmark.encode_chapter 反向生成。
+'''
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import deque
+
+from aiohttp import web
+
+from benchmark import encode_chapter, encode_epub_chapter, sample_text
+from book_util import WereadGenerate
+
+WEREAD_HOST = 'https://weread.qq.com'
+MOCK_SID = 'mock-sid'
+
+
+class MockWeread:
+
+    def __init__(self, chapters=50, chapter_size=16 * 1024, fmt='epub', latency=0.05,
+                 error_rate=0.0, error_status=503, seed=0, rate_limit=None, require_cookie=None,
+                 shelf_size=0):
+        self.fmt = fmt
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.random = random.Random(seed)
+        # 限流：最近 1 秒内的请求数超过 rate_limit 时返回 429
+        self.rate_limit = rate_limit
+        self.recent = deque()
+        self.throttled = 0
+        # 登录校验：(name, value)，请求未携带该 cookie 时返回 401
+        self.require_cookie = require_cookie
+        self.requests = 0
+        self.errors = 0
+        self.inflight = 0
+        self.max_inflight = 0
+
+        generate = WereadGenerate()
+        self.chapter_ids = list(range(1, chapters + 1))
+        self.chapter_hashes = dict(zip(generate.book_hash_many(self.chapter_ids), self.chapter_ids))
+        self.chapter_size = chapter_size
+        self.search_total = 45
+        self.shelf = {}
+        for i in range(shelf_size):
+            self.add_shelf_book(f'8{i:06d}')
+        self.sync_requests = 0
+        # syncBook 不返回这些书，模拟书籍更新失败
+        self.sync_missing = set()
+        self._parts = {}
+
+    def chapter_parts(self, chapter_id):
+        if chapter_id not in self._parts:
+            text = sample_text(self.chapter_size, seed=chapter_id)
+            if self.fmt == 'epub':
+                self._parts[chapter_id] = encode_epub_chapter(text, seed=chapter_id)
+            else:
+                self._parts[chapter_id] = encode_chapter(text, parts=2, seed=chapter_id)
+        return self._parts[chapter_id]
+
+    def chapter_text(self, chapter_id):
+        return sample_text(self.chapter_size, seed=chapter_id)
+
+    @web.middleware
+    async def middleware(self, request, handler):
+        """
+        统一注入延迟和错误
+        """
+        self.requests += 1
+        self.inflight += 1
+        self.max_inflight = max(self.max_inflight, self.inflight)
+        try:
+            if self.require_cookie:
+                name, value = self.require_cookie
+                if request.cookies.get(name) != value:
+                    self.errors += 1
+                    return web.Response(status=401, text='login required')
+            if self.rate_limit:
+                now = time.monotonic()
+                while self.recent and now - self.recent[0] > 1:
+                    self.recent.popleft()
+                if len(self.recent) >= self.rate_limit:
+                    self.throttled += 1
+                    return web.Response(status=429, text='too many requests')
+                self.recent.append(now)
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            if self.error_rate and self.random.random() < self.error_rate:
+                self.errors += 1
+                return web.Response(status=self.error_status, text='mock error')
+            return await handler(request)
+        finally:
+            self.inflight -= 1
+
+    async def chapter_infos(self, request):
+        data = await request.json()
+        updated = [{'chapterUid': cid, 'title': f'第{cid}章', 'level': 1} for cid in self.chapter_ids]
+        return web.json_response({'data': [{'bookId': data['bookIds'][0], 'updated': updated}]})
+
+    async def chapter(self, request):
+        data = json.loads(await request.text())
+        chapter_id = self.chapter_hashes.get(data.get('c'))
+        if chapter_id is None:
+            return web.Response(status=404, text='chapter not found')
+        part = request.match_info['part']
+        return web.Response(text=self.chapter_parts(chapter_id)[int(part[2:])])
+
+    def add_shelf_book(self, book_id, update_time=1):
+        self.shelf[book_id] = {'bookId': book_id, 'title': f'书架 {book_id}', 'author': 'mock', 'cover': '',
+                               'updateTime': update_time}
+
+    def shelf_indexes(self):
+        '''
+        书架页 __INITIAL_STATE__.shelf.shelfIndexes
+        '''
+        return [{'bookId': book_id, 'idx': idx, 'role': 'book', 'updateTime': book['updateTime']}
+                for idx, (book_id, book) in enumerate(self.shelf.items())]
+
+    async def shelf_page(self, request):
+        '''
+        /web/shelf：书架页 HTML，shelfIndexes 在 window.__INITIAL_STATE__ 中
+        '''
+        state = json.dumps({'shelf': {'shelfIndexes': self.shelf_indexes()}}, ensure_ascii=False)
+        html = f'<html><body><script>window.__INITIAL_STATE__={state};</script></body></html>'
+        return web.Response(text=html, content_type='text/html')
+
+    async def sync_book(self, request):
+        self.sync_requests += 1
+        data = await request.json()
+        books = [self.shelf[book_id] for book_id in data['bookIds']
+                 if book_id in self.shelf and book_id not in self.sync_missing]
+        return web.json_response({'books': books})
+
+    async def user(self, request):
+        '''
+        /web/user：未携带 require_cookie 时由 middleware 返回 401
+        '''
+        return web.json_response({'userVid': int(request.query.get('userVid', 0)), 'name': 'mock'})
+
+    async def store_search(self, request):
+        """
+        /api/store/search：sid 不是 MOCK_SID 时返回 errCode，按 maxIdx / count 分页
+        """
+        query = request.query
+        if query.get('sid') != MOCK_SID:
+            return web.json_response({'errCode': -2012, 'errMsg': '登录超时'})
+        keyword = query.get('keyword', '')
+        total = self.search_total
+        start = int(query.get('maxIdx', 0))
+        count = int(query.get('count', 5 if 'scope' not in query else 20))
+        books = [{'bookInfo': {'bookId': f'9{i:05d}', 'title': f'{keyword} {i}', 'author': 'mock', 'cover': ''}}
+                 for i in range(start, min(total, start + count))]
+        return web.json_response({
+            'results': [{'title': '电子书', 'books': books, 'scope': 17, 'scopeCount': total,
+                         'currentCount': len(books), 'type': 1}],
+            'hasMore': start + len(books) < total,
+        })
+
+    def app(self):
+        app = web.Application(middlewares=[self.middleware])
+        app.router.add_get('/api/store/search', self.store_search)
+        app.router.add_post('/web/shelf/syncBook', self.sync_book)
+        app.router.add_get('/web/user', self.user)
+        app.router.add_get('/web/shelf', self.shelf_page)
+        app.router.add_post('/web/book/chapterInfos', self.chapter_infos)
+        app.router.add_post('/web/book/chapter/{part}', self.chapter)
+        return app
+
+
+async def start_server(mock: MockWeread, port=0):
+    """
+    :return: (runner, base_url)，用完调用 runner.cleanup()
+    """
+    runner = web.AppRunner(mock.app())
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', port)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f'http://127.0.0.1:{port}'
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='本地模拟 weread 接口')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--chapters', type=int, default=50)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--rate-limit', type=int, help='每秒最多处理的请求数，超出返回 429')
+    args = parser.parse_args()
+
+    web.run_app(MockWeread(args.chapters, latency=args.latency, error_rate=args.error_rate,
+                           error_status=args.error_status, rate_limit=args.rate_limit).app(),
+                host='127.0.0.1', port=args.port)
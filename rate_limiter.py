@@ -0,0 +1,106 @@
+'''
+下载请求的自适应限速：令牌桶 + AIMD
+
+- 每次请求前 await limiter.acquire() 取一个令牌，令牌按 rate（次/秒）补充
+- 请求结束后 limiter.record(ok, latency) 反馈结果：
+    响应正常且延迟平稳 -> 加性增加 rate（首次降速前为慢启动，按次数增加，速率成倍上涨）
+    非 200（429 / 5xx）或延迟明显升高 -> rate 乘性减少
+- 同一个 limiter 由下载线程的所有 page 共享，当前速率见 limiter.rate / limiter.snapshot()
+'''
+import asyncio
+import time
+
+from constants import RATE_INITIAL, RATE_MIN, RATE_MAX, RATE_INCREASE, RATE_DECREASE, RATE_BURST, \
+    RATE_LATENCY_FACTOR, RATE_COOLDOWN
+
+
+class AdaptiveRateLimiter:
+
+    def __init__(self, rate=RATE_INITIAL, min_rate=RATE_MIN, max_rate=RATE_MAX, increase=RATE_INCREASE,
+                 decrease=RATE_DECREASE, burst=RATE_BURST, latency_factor=RATE_LATENCY_FACTOR,
+                 cooldown=RATE_COOLDOWN):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.burst = burst
+        self.latency_factor = latency_factor
+        self.cooldown = cooldown
+
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+        # 延迟：指数滑动平均，以及观察到的最低平均延迟作为基线
+        self.latency = None
+        self.baseline = None
+        self.last_decrease = 0.0
+        self.slow_start = True
+
+        self.requests = 0
+        self.failures = 0
+        self.decreases = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        """
+        等待一个令牌，多个请求按先来后到排队
+        """
+        async with self.lock:
+            while True:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def record(self, ok: bool, latency: float):
+        """
+        反馈一次请求的结果
+        :param ok: 响应是否为 2xx
+        :param latency: 请求耗时（秒）
+        """
+        self.requests += 1
+        if not ok:
+            self.failures += 1
+            self._decrease()
+            return
+
+        self.latency = latency if self.latency is None else self.latency * 0.8 + latency * 0.2
+        # 基线缓慢上浮，服务器整体变慢后不会一直判定为拥塞
+        self.baseline = self.latency if self.baseline is None else min(self.baseline * 1.01, self.latency)
+
+        if self.latency > self.baseline * self.latency_factor:
+            self._decrease()
+        elif self.slow_start:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+        else:
+            # 每秒大约增加 increase 次/秒
+            self.rate = min(self.max_rate, self.rate + self.increase / self.rate)
+
+    def _decrease(self):
+        # 同一批并发请求的失败只降一次速
+        now = time.monotonic()
+        if now - self.last_decrease < self.cooldown:
+            return
+        self.last_decrease = now
+        self.decreases += 1
+        self.slow_start = False
+        self._refill()
+        self.rate = max(self.min_rate, self.rate * self.decrease)
+        self.tokens = min(self.tokens, 1)
+
+    def snapshot(self):
+        return {
+            'rate': round(self.rate, 2),
+            'latency': round(self.latency or 0, 4),
+            'baseline': round(self.baseline or 0, 4),
+            'requests': self.requests,
+            'failures': self.failures,
+            'decreases': self.decreases,
+        }
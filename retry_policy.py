@@ -0,0 +1,189 @@
+'''
+网络请求的重试策略：指数退避 + 随机抖动，按状态码分类
+
+- 2xx 成功，304 条件请求命中同样视为成功
+- 401 / 403 登录失效，立即放弃（RetryAbort）
+- 408 / 429 / 5xx、超时和连接错误，退避后重试
+- 其他 4xx 重试也不会成功，立即放弃
+
+同一本书的请求共用一个 RetryBudget：起始 RETRY_BUDGET 次，每个成功的请求再增加 RETRY_BUDGET_RATIO 次
+（与 gRPC 的重试限流相同，按成功请求的比例限制重试），章节越多可用的重试越多；
+服务器持续异常、没有成功的请求时，用完起始次数即不再重试，避免整本书反复重试。
+各类结果计入 retry_counters，按「名称.结果」统计，如 chapter.retry / chapter.status.503。
+'''
+import asyncio
+import random
+import time
+from collections import Counter
+
+import aiohttp
+import requests
+from playwright.async_api import Error as PlaywrightError
+
+from constants import RETRY_ATTEMPTS, RETRY_BASE_DELAY, RETRY_MAX_DELAY, RETRY_BUDGET_RATIO
+
+OK = 'ok'
+RETRY = 'retry'
+ABORT = 'abort'
+
+NOT_MODIFIED = 304
+AUTH_STATUS = {401, 403}
+RETRY_STATUS = {408, 429}
+
+# 可重试的异常：超时、连接断开等
+TRANSIENT_ERRORS = (asyncio.TimeoutError, TimeoutError, ConnectionError, aiohttp.ClientError,
+                    requests.RequestException, PlaywrightError)
+
+retry_counters = Counter()
+
+
+class RetryAbort(Exception):
+    """
+    不可重试的错误（登录失效、请求参数错误等）
+    """
+
+    def __init__(self, msg, status=None):
+        super().__init__(msg)
+        self.status = status
+
+
+class RetryExhausted(Exception):
+    """
+    重试次数或本书的重试预算用完
+    """
+
+    def __init__(self, msg, status=None):
+        super().__init__(msg)
+        self.status = status
+
+
+def classify(status=None, error=None):
+    """
+    :param status: HTTP 状态码，请求抛出异常时为 None
+    :param error: 请求抛出的异常
+    :return: OK / RETRY / ABORT
+    """
+    if error is not None:
+        return RETRY if isinstance(error, TRANSIENT_ERRORS) else ABORT
+    if 200 <= status < 300 or status == NOT_MODIFIED:
+        return OK
+    if status in AUTH_STATUS:
+        return ABORT
+    if status in RETRY_STATUS or status >= 500:
+        return RETRY
+    return ABORT
+
+
+def response_status(response):
+    """
+    playwright / aiohttp 响应为 status，requests 响应为 status_code
+    """
+    status = getattr(response, 'status', None)
+    return response.status_code if status is None else status
+
+
+class RetryBudget:
+    """
+    一本书所有请求共用的重试次数：起始 base 次，每个成功的请求增加 ratio 次
+    """
+
+    def __init__(self, base, ratio=RETRY_BUDGET_RATIO):
+        self.base = base
+        self.ratio = ratio
+        self.succeeded = 0
+        self.used = 0
+
+    @property
+    def limit(self):
+        return self.base + int(self.succeeded * self.ratio)
+
+    def deposit(self):
+        self.succeeded += 1
+
+    def consume(self):
+        if self.used >= self.limit:
+            return False
+        self.used += 1
+        return True
+
+
+class RetryPolicy:
+
+    def __init__(self, name, attempts=RETRY_ATTEMPTS, base_delay=RETRY_BASE_DELAY, max_delay=RETRY_MAX_DELAY,
+                 budget: RetryBudget = None):
+        self.name = name
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget
+
+    def delay(self, attempt):
+        """
+        第 attempt 次重试前的等待时间：full jitter，在 [0, min(max_delay, base * 2^attempt)] 内随机
+        """
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _next(self, attempt, response, error):
+        """
+        记录一次请求结果
+        :return: 需要重试时返回等待时间，成功返回 None，否则抛出 RetryAbort / RetryExhausted
+        """
+        status = None if error is not None else response_status(response)
+        verdict = classify(status, error)
+        reason = status if error is None else type(error).__name__
+
+        retry_counters[f'{self.name}.{verdict}'] += 1
+        if status is not None and verdict != OK:
+            retry_counters[f'{self.name}.status.{status}'] += 1
+
+        if verdict == OK:
+            if self.budget is not None:
+                self.budget.deposit()
+            return None
+        if verdict == ABORT:
+            if status in AUTH_STATUS:
+                raise RetryAbort(f'登录已失效，请重新登录。（{self.name} {status}）', status) from error
+            raise RetryAbort(f'请求失败：{self.name} {reason}', status) from error
+
+        print(f"请求失败: {self.name} {reason}，第 {attempt + 1} 次")
+        if attempt + 1 >= self.attempts or (self.budget is not None and not self.budget.consume()):
+            retry_counters[f'{self.name}.exhausted'] += 1
+            raise RetryExhausted(f'网络请求失败，稍后再试。（{self.name} {reason}）', status) from error
+        return self.delay(attempt + 1)
+
+    async def run(self, send):
+        """
+        :param send: 无参协程函数，发出一次请求并返回响应
+        :return: 成功的响应
+        """
+        attempt = 0
+        while True:
+            try:
+                response, error = await send(), None
+            except Exception as e:
+                response, error = None, e
+            wait = self._next(attempt, response, error)
+            if wait is None:
+                return response
+            await asyncio.sleep(wait)
+            attempt += 1
+
+    def run_sync(self, send):
+        """
+        同步版本，用于 requests 和 QThread 中的下载
+        """
+        attempt = 0
+        while True:
+            try:
+                response, error = send(), None
+            except Exception as e:
+                response, error = None, e
+            wait = self._next(attempt, response, error)
+            if wait is None:
+                return response
+            time.sleep(wait)
+            attempt += 1
+
+
+def retry_snapshot():
+    return dict(retry_counters)
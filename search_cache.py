@@ -0,0 +1,94 @@
+'''
+搜索结果的磁盘缓存 SEARCH_CACHE_PATH（SQLite，每个结果页一行）
+
+- 键：规范化后的关键词 + scope + maxIdx（首次搜索 scope 为空、maxIdx 为 0）
+- SEARCH_CACHE_TTL 内的结果直接使用；超过 TTL 但未超过 SEARCH_CACHE_MAX_AGE 的先显示，同时后台刷新
+  （stale-while-revalidate）；超过 SEARCH_CACHE_MAX_AGE 的丢弃
+- 最多保留 SEARCH_CACHE_SIZE 条，按最近使用淘汰
+
+每次读写只涉及一行，不再整体序列化；第一次使用时才打开数据库。只在 GUI 线程中读写。
+'''
+import json
+import re
+import sqlite3
+import time
+import unicodedata
+
+from constants import SEARCH_CACHE_PATH, SEARCH_CACHE_TTL, SEARCH_CACHE_MAX_AGE, SEARCH_CACHE_SIZE
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS pages (
+    key TEXT PRIMARY KEY,
+    time REAL NOT NULL,
+    used REAL NOT NULL,
+    url TEXT NOT NULL,
+    data TEXT NOT NULL
+)
+'''
+
+
+def normalize_keyword(keyword):
+    '''
+    全角转半角、去掉首尾空白、合并连续空白、英文转小写
+    '''
+    keyword = unicodedata.normalize('NFKC', keyword)
+    return re.sub(r'\s+', ' ', keyword).strip().lower()
+
+
+class SearchCache:
+
+    def __init__(self, path=SEARCH_CACHE_PATH, ttl=SEARCH_CACHE_TTL, max_age=SEARCH_CACHE_MAX_AGE,
+                 max_entries=SEARCH_CACHE_SIZE):
+        self.path = path
+        self.ttl = ttl
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self._conn = None
+
+    @property
+    def conn(self):
+        # 第一次读写时才打开（创建）数据库，导入模块不读取缓存
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path)
+            # WAL + NORMAL：提交时不等待 fsync，GUI 线程中写入一行只需要很短时间
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            with self._conn:
+                self._conn.execute(SCHEMA)
+                self._conn.execute('CREATE INDEX IF NOT EXISTS pages_used ON pages (used)')
+        return self._conn
+
+    @staticmethod
+    def key(keyword, scope=None, max_idx=None):
+        return f'{normalize_keyword(keyword)}|{"" if scope is None else scope}|{max_idx or 0}'
+
+    def get(self, keyword, scope=None, max_idx=None):
+        '''
+        :return: (url, data, fresh)，没有可用缓存时返回 None；fresh 为 False 时调用方应在后台刷新
+        '''
+        key = self.key(keyword, scope, max_idx)
+        row = self.conn.execute('SELECT time, url, data FROM pages WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+
+        now = time.time()
+        age = now - row[0]
+        with self.conn:
+            if age > self.max_age:
+                self.conn.execute('DELETE FROM pages WHERE key = ?', (key,))
+                return None
+            # 记录最近使用时间，淘汰时从最久未使用的开始
+            self.conn.execute('UPDATE pages SET used = ? WHERE key = ?', (now, key))
+        return row[1], json.loads(row[2]), age <= self.ttl
+
+    def put(self, keyword, scope, max_idx, url, data):
+        key = self.key(keyword, scope, max_idx)
+        now = time.time()
+        with self.conn:
+            self.conn.execute('INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)',
+                              (key, now, now, url, json.dumps(data, ensure_ascii=False)))
+            self.conn.execute('DELETE FROM pages WHERE key NOT IN '
+                              '(SELECT key FROM pages ORDER BY used DESC, rowid DESC LIMIT ?)', (self.max_entries,))
+
+
+search_cache = SearchCache()
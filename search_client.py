@@ -0,0 +1,96 @@
+'''
+直接请求搜索接口 /api/store/search，不再每次打开网页、输入关键词、等待页面加载
+
+请求参数中的 sid 和请求头来自浏览器搜索时捕获的请求（req_search_books），捕获后保存在 SEARCH_SESSION_PATH，
+之后的搜索和翻页（scope / maxIdx / count）都直接请求接口。没有可用的 sid 或接口拒绝时，由调用方回退到浏览器搜索。
+
+协程须在 browser_service 的事件循环中运行（连接池绑定在该循环上）。
+'''
+import json
+import os
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+from constants import SEARCH_SESSION_PATH, SEARCH_PAGE_SIZE
+from http_transport import CookieTransport
+from retry_policy import RetryPolicy
+
+SEARCH_API_URL = 'https://weread.qq.com/api/store/search'
+
+# 捕获的请求头中这些由连接池自己处理
+SKIP_HEADERS = {'accept-encoding', 'cookie', 'content-length', 'host'}
+
+
+class SearchSessionExpired(Exception):
+    pass
+
+
+class SearchClient:
+
+    def __init__(self, path=SEARCH_SESSION_PATH):
+        self.path = path
+        self.params = {}
+        self.headers = {}
+        self.http = None
+        self._load()
+
+    def _load(self):
+        if os.path.exists(self.path):
+            try:
+                data = json.load(open(self.path, encoding='utf8'))
+                self.params = data.get('params', {})
+                self.headers = data.get('headers', {})
+            except (OSError, ValueError):
+                pass
+
+    @property
+    def ready(self):
+        return bool(self.params.get('sid'))
+
+    def capture(self, url, headers):
+        '''
+        保存浏览器搜索请求中的 sid 等参数（去掉 keyword 和分页参数）和请求头
+        '''
+        params = dict(parse_qsl(urlsplit(url).query))
+        for key in ('keyword', 'scope', 'maxIdx', 'count'):
+            params.pop(key, None)
+        self.params = params
+        self.headers = {k: v for k, v in headers.items() if k.lower() not in SKIP_HEADERS}
+        open(self.path, 'w', encoding='utf8').write(
+            json.dumps({'params': self.params, 'headers': self.headers}, ensure_ascii=False, indent=4))
+
+    def invalidate(self):
+        self.params = {}
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def url(self, keyword, scope=None, max_idx=None, count=SEARCH_PAGE_SIZE):
+        params = {'keyword': keyword, **self.params}
+        if scope is not None:
+            params.update(scope=scope, maxIdx=max_idx or 0, count=count)
+        return f'{SEARCH_API_URL}?{urlencode(params)}'
+
+    async def search(self, keyword, scope=None, max_idx=None, count=SEARCH_PAGE_SIZE):
+        '''
+        :param scope: 翻页时传入上一页结果中的 scope，首次搜索为 None
+        :return: (url, 接口返回的 JSON)
+        '''
+        if not self.ready:
+            raise SearchSessionExpired('没有可用的搜索会话')
+        if self.http is None:
+            self.http = await CookieTransport(storage=None).open()
+
+        url = self.url(keyword, scope, max_idx, count)
+        try:
+            response = await RetryPolicy('search').run(lambda: self.http.get(url, headers=self.headers))
+            data = await response.json()
+        except Exception as e:
+            raise SearchSessionExpired(f'搜索接口请求失败：{e}') from e
+
+        # 会话失效时接口返回 errCode
+        if not isinstance(data, dict) or data.get('errCode'):
+            self.invalidate()
+            raise SearchSessionExpired(f'搜索会话已失效：{data}')
+        return url, data
+
+
+search_client = SearchClient()
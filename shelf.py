@@ -1,6 +1,5 @@
 import asyncio
 import json
-import math
 import os.path
 import re
 import time
@@ -8,10 +7,15 @@ import traceback
 
 import aiohttp
 from bs4 import BeautifulSoup
-from playwright.async_api import async_playwright
 
-from book_util import WereadGenerate
-from constants import BOOK_SHELF_PATH, STORAGE, COVER_DIR, CHROME_DIR
+from book_manifest import atomic_write_text, atomic_write_bytes
+from book_util import WereadGenerate, load_my_books
+from browser_service import browser_service
+from http_transport import HttpResponse, CookieTransport
+from retry_policy import RetryPolicy, RetryBudget, NOT_MODIFIED
+from shelf_index import ShelfIndex, ShelfDelta
+from constants import BOOK_SHELF_PATH, STORAGE, COVER_DIR, RETRY_ATTEMPTS, RETRY_BUDGET, SHELF_SYNC_BATCH, \
+    SHELF_SYNC_CONCURRENCY, COVER_CONCURRENCY, SESSION_CHECK_TIMEOUT
 
 # if not os.path.exists(STORAGE):
 #     raise 'weread_state.json can found。'
@@ -23,19 +27,72 @@ shelfIndexes = []
 
 
 
-async def download_image(url, filename):
-    try:
-        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(ssl=False)) as session:
-            async with session.get(url) as resp:
-                if resp.status == 200:
-                    data = await resp.read()
-                    with open(filename, "wb") as f:
-                        f.write(data)
-                    print("已保存:", filename)
-                else:
-                    print("下载失败:", url)
-    except Exception as e:
-        print("下载异常:", e, url)
+class CoverDownloader:
+    """
+    同步书架时下载封面：整次同步共用一个连接池，最多 concurrency 个请求同时进行
+
+    已有的封面用 {封面文件}.cache.json 中保存的 ETag / Last-Modified 发条件请求，304 时不再下载；
+    封面先写临时文件再替换，中途退出不会留下不完整的图片。
+
+        async with CoverDownloader() as covers:
+            await asyncio.gather(*[covers.download(url, filename) for ...])
+    """
+
+    def __init__(self, concurrency=COVER_CONCURRENCY):
+        self.concurrency = concurrency
+        self.window = asyncio.Semaphore(concurrency)
+        self.session = None
+        self.saved = 0
+        self.not_modified = 0
+        self.failed = 0
+
+    async def __aenter__(self):
+        self.session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(ssl=False, limit=self.concurrency))
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+
+    @staticmethod
+    def _validators_path(filename):
+        return f'{filename}.cache.json'
+
+    def _validators(self, filename):
+        if not os.path.exists(filename):
+            return {}
+        try:
+            return json.load(open(self._validators_path(filename), encoding='utf8'))
+        except (OSError, ValueError):
+            return {}
+
+    async def download(self, url, filename):
+        validators = self._validators(filename)
+        headers = {}
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+
+        async def send():
+            # 连接归还连接池前读完响应体
+            async with self.session.get(url, headers=headers) as resp:
+                return HttpResponse(resp.status, await resp.read(), resp.headers)
+
+        async with self.window:
+            try:
+                resp = await RetryPolicy('cover').run(send)
+                if resp.status == NOT_MODIFIED:
+                    self.not_modified += 1
+                    return
+                atomic_write_bytes(filename, resp.body)
+                validators = {'etag': resp.headers.get('ETag'), 'last_modified': resp.headers.get('Last-Modified')}
+                if any(validators.values()):
+                    atomic_write_text(self._validators_path(filename), json.dumps(validators))
+                self.saved += 1
+                print("已保存:", filename)
+            except Exception as e:
+                self.failed += 1
+                print("下载异常:", e, url)
 
 
 def parser_shelf(text):
@@ -96,58 +153,39 @@ async def handle_response(response):
 
 
 async def load_browser():
-
-    p = await async_playwright().start()  # 不使用 async with
-
-    browser = await p.chromium.launch(headless=False, executable_path=CHROME_DIR)  # 可改 True
-
-    # 如果已经有会话文件，加载它
-    try:
-        context = await browser.new_context(storage_state=STORAGE, )
-        print("加载已有会话:", STORAGE)
-    except Exception:
-        traceback.print_exc()
-        context = await browser.new_context()
-        print("创建新会话")
-
-    return p, browser, context
+    '''
+    :return: (p, browser, context)，来自共享的 browser_service，context 携带登录会话，调用方不要关闭
+    '''
+    context = await browser_service.context()
+    return browser_service.playwright, await browser_service.browser(), context
 
 async def load_search_browser():
-
-    p = await async_playwright().start()  # 不使用 async with
-
-    browser = await p.chromium.launch(headless=True, executable_path=CHROME_DIR)  # 可改 True
-
-    # 如果已经有会话文件，加载它
-    try:
-        context = await browser.new_context()
-    except Exception:
-        traceback.print_exc()
-        context = await browser.new_context()
-        print("创建新会话")
-
-    return p, browser, context
+    '''
+    :return: (p, browser, context)，搜索用的共享 context（不带会话），调用方不要关闭
+    '''
+    context = await browser_service.search_context()
+    return browser_service.playwright, await browser_service.browser(), context
 
 
-async def login_weread():
-    p, browser, context = await load_browser()
+# 监听所有请求
+async def log_request(req):
+    if 'weread.qq.com/web/shelf/syncBook' in req.url:
+        print("请求 URL:", req.url)
+        print("请求方法:", req.method)
+        print("完整请求头:", json.dumps(req.headers, indent=2))
+        if req.post_data:
+            print("请求体:", req.post_data)
 
-    print("已点击登录按钮")
 
+async def open_home_page(context):
+    '''
+    打开首页并查找「登录」按钮
+    :return: (page, login_btn)，已登录时 login_btn 为 None
+    '''
     page = await context.new_page()
 
     # 拦截 network response
     page.on("response", handle_response)
-
-    # 监听所有请求
-    async def log_request(req):
-        if 'weread.qq.com/web/shelf/syncBook' in req.url:
-            print("请求 URL:", req.url)
-            print("请求方法:", req.method)
-            print("完整请求头:", json.dumps(req.headers, indent=2))
-            if req.post_data:
-                print("请求体:", req.post_data)
-
     page.on("request", log_request)
 
     await page.goto("https://weread.qq.com/")
@@ -167,6 +205,145 @@ async def login_weread():
     else:
         print("未发现登录按钮")
 
+    return page, login_btn
+
+
+class ShelfSyncError(Exception):
+    """
+    书架同步失败（登录失效、某一批重试用完），本地书架保持不变
+    """
+
+
+async def fetch_books(request, book_ids, retry: RetryPolicy):
+    '''
+    请求一批 syncBook
+    :return: 书籍数据
+    '''
+    url = "https://weread.qq.com/web/shelf/syncBook"
+    payload = {
+        "bookIds": book_ids,
+        "count": SHELF_SYNC_BATCH,
+        "isArchive": None,
+        "currentArchiveId": None,
+        "loadMore": True
+    }
+    headers = {
+        "Content-Type": "application/json;charset=UTF-8",
+        "accept": "application/json, text/plain, */*"
+    }
+
+    # 5xx / 超时退避重试，登录失效或重试用完时抛出
+    response = await retry.run(lambda: request.post(url, data=json.dumps(payload), headers=headers))
+
+    data = await response.json()
+    if data.get('errCode'):
+        raise ShelfSyncError(f'syncBook 返回错误：{data}')
+
+    books = data.get('books', [])
+    if not books:
+        # 书可能刚被移出书架；不记录更新标记，下次同步会重新请求
+        print(f"syncBook 未返回书籍：{book_ids[0]} 等 {len(book_ids)} 本")
+    print("书籍数据:", json.dumps([b['title'] for b in books], ensure_ascii=False, ))
+    return books
+
+
+async def sync_books(request, book_ids, batch=SHELF_SYNC_BATCH, concurrency=SHELF_SYNC_CONCURRENCY):
+    '''
+    按 batch 本一批请求 syncBook，最多 concurrency 批同时进行，结果按批次顺序拼接
+    :param request: page.request 或 CookieTransport
+    :return: 书籍数据，按 book_ids 的顺序
+    '''
+    window = asyncio.Semaphore(concurrency)
+    # 整个书架共用重试预算，服务器持续异常时尽快失败
+    budget = RetryBudget(RETRY_BUDGET)
+
+    async def fetch(ids):
+        async with window:
+            return await fetch_books(request, ids, RetryPolicy('syncBook', budget=budget))
+
+    tasks = [asyncio.ensure_future(fetch(book_ids[offset: offset + batch]))
+             for offset in range(0, len(book_ids), batch)]
+    try:
+        results = await asyncio.gather(*tasks)
+    except Exception as e:
+        # 一批失败整个同步失败，取消其余批次
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if isinstance(e, ShelfSyncError):
+            raise
+        raise ShelfSyncError(f'书架同步失败：{e}') from e
+
+    return [book for books in results for book in books]
+
+
+def _session_vid(storage):
+    '''
+    会话 cookie 中的 wr_vid，没有时用上次保存的用户信息
+    '''
+    state = json.load(open(storage, encoding='utf8'))
+    for cookie in state.get('cookies', []):
+        if cookie['name'] == 'wr_vid':
+            return cookie['value']
+    if os.path.exists('user_info.json'):
+        return json.load(open('user_info.json', encoding='utf8')).get('userVid')
+    return None
+
+
+async def check_session(storage=STORAGE, base_url=None):
+    '''
+    不启动浏览器，直接用 STORAGE 中的 cookie 请求用户接口，判断会话是否仍然有效
+    :param base_url: 测试用，见 CookieTransport
+    :return: 用户信息，没有会话文件、会话失效或请求失败时返回 None
+    '''
+    if not os.path.exists(storage):
+        return None
+    try:
+        vid = _session_vid(storage)
+        if not vid:
+            return None
+        async with CookieTransport(storage, base_url=base_url, timeout=SESSION_CHECK_TIMEOUT) as http:
+            response = await http.get(f'https://weread.qq.com/web/user?userVid={vid}')
+            data = await response.json() if response.ok else {}
+    except Exception as e:
+        print("会话检查失败:", e)
+        return None
+
+    # 会话失效时返回 401 或带 errCode 的 JSON
+    if not isinstance(data, dict) or data.get('errCode') or not data.get('userVid'):
+        print("会话已失效，需要重新登录")
+        return None
+
+    user_data.clear()
+    user_data.update(data)
+    open('user_info.json', 'w', encoding='utf8').write(json.dumps(user_data, ensure_ascii=False, indent=4))
+    print("会话有效:", data.get('name'))
+    return data
+
+
+async def login_weread():
+    p, browser, context = await load_browser()
+
+    page, login_btn = await open_home_page(context)
+
+    # 共享浏览器是无头模式时，扫码登录换到单独启动的有界面浏览器
+    login_browser = None
+    if login_btn and browser_service.headless:
+        await page.close()
+        login_browser, context = await browser_service.launch_interactive()
+        page, login_btn = await open_home_page(context)
+
+    try:
+        return await _login_and_sync_shelf(context, page, login_btn)
+    finally:
+        await page.close()
+        if login_browser:
+            await login_browser.close()
+            # 扫码后的会话已写入 STORAGE，共享浏览器重新加载
+            await browser_service.reload_session()
+
+
+async def _login_and_sync_shelf(context, page, login_btn):
     # 如果是“登录”，才点击
     if login_btn:
         await login_btn.click()
@@ -214,99 +391,102 @@ async def login_weread():
     </div>
     '''
 
+    attempts = 0
     while not user_data.get('userVid'):
+        if attempts >= RETRY_ATTEMPTS:
+            raise ShelfSyncError('未获取到用户信息，请重新登录')
+        attempts += 1
         await asyncio.sleep(2)
         if not user_data.get('userVid'):
             await page.reload(wait_until="networkidle")
 
-    books = []
-    offset = 0
-    limit = 50
-    print(f'shelfIndexes size: {len(shelfIndexes)}')
-
-    for i in range(1, math.ceil(len(shelfIndexes) / limit) + 1):
-
-        book_ids = [f'{book["bookId"]}' for book in shelfIndexes[offset: offset + limit]]
-
-        if not book_ids:
-            break
-
-        # 请求接口
-        url = "https://weread.qq.com/web/shelf/syncBook"
-        payload = {
-            "bookIds": book_ids,
-            "count": limit,
-            "isArchive": None,
-            "currentArchiveId": None,
-            "loadMore": True
-        }
-
-        offset += limit
+    return await sync_shelf(page.request)
 
-        # 使用 page.request.post 创建请求对象
-        request = page.request
-        headers = {
-            "Content-Type": "application/json;charset=UTF-8",
-            "accept": "application/json, text/plain, */*"
-        }
 
-        print("请求体：", payload)
-
-        while True:
+async def sync_shelf_http(storage=STORAGE, base_url=None):
+    '''
+    会话有效时不经过浏览器同步书架：用 cookie 直接请求书架页解析 shelfIndexes，再增量请求 syncBook
+    :param base_url: 测试用，见 CookieTransport
+    :return: 同 login_weread；会话失效或书架页解析失败时返回 None，由调用方走浏览器登录
+    '''
+    if await check_session(storage, base_url) is None:
+        return None
 
-            response = await request.post(url, data=json.dumps(payload), headers=headers)
+    async with CookieTransport(storage, base_url=base_url) as http:
+        response = await RetryPolicy('shelf').run(lambda: http.get("https://weread.qq.com/web/shelf"))
+        shelfIndexes.clear()
+        parser_shelf(await response.text())
+        if not shelfIndexes:
+            print("书架页未解析到 shelfIndexes")
+            return None
+        return await sync_shelf(http)
 
-            if response.ok:
-                data = await response.json()
-                books = books + data.get('books', [])
 
-                book_titles = [b['title'] for b in data.get('books', [])]
+async def sync_shelf(request):
+    '''
+    按 shelfIndexes 增量同步书架，保存 book_shelf.json 和封面
+    :param request: page.request 或 CookieTransport
+    :return: (user_data, books, delta)
+    '''
+    print(f'shelfIndexes size: {len(shelfIndexes)}')
 
-                print("书籍数据:", json.dumps(book_titles, ensure_ascii=False, ))
+    # 只请求新增和变化的书，移除的书直接从本地书架删除
+    old_books = load_my_books()
+    shelf_index = ShelfIndex()
+    user_vid = user_data.get('userVid')
+    if shelfIndexes:
+        delta = shelf_index.diff(shelfIndexes, old_books, user_vid)
+    else:
+        # 书架页解析失败时不能当作书架已清空
+        print('未获取到 shelfIndexes，保留本地书架')
+        delta = ShelfDelta([], 0, 0, 0)
+    print(f'书架变化：{delta}')
 
-                if books:
-                    break
+    fetched = await sync_books(request, delta.fetch)
 
-            else:
-                print("请求失败:", response.status)
+    # 批量计算 bookHash，随书架一起保存，启动时不再重复计算
+    book_util = WereadGenerate()
+    for book, book_hash in zip(fetched, book_util.book_hash_many(book['bookId'] for book in fetched)):
+        book['bookHash'] = book_hash
 
+    books = ShelfIndex.merge(shelfIndexes, old_books, fetched) if shelfIndexes else old_books
     print(f'book shelf size: {len(books)}')
 
-    # 遍历书架，下载图片
-    book_util = WereadGenerate()
-    tasks = []
+    # 遍历书架，下载缺少的封面；有变化的书用条件请求确认封面是否更新
+    changed = set(delta.fetch)
+    covers = []
     for book in books:
         img_url = book["cover"]
         if not img_url:
             continue
 
-        book['bookHash'] = book_util.book_hash(book['bookId'])
-
         ext = os.path.splitext(img_url)[1].split("?")[0]  # 保留 jpg/png
         if ext.lower() not in [".jpg", ".jpeg", ".png"]:
             ext = ".jpg"  # 默认 jpg
 
         filename = os.path.join(COVER_DIR, f'{book["bookHash"]}{ext}')
-        if not os.path.exists(filename):
-            tasks.append(download_image(img_url, filename))
-
-    if books:
-        open(BOOK_SHELF_PATH, 'w', encoding='utf8').write(json.dumps(books, ensure_ascii=False, indent=4))
-
-    if tasks:
-        await asyncio.gather(*tasks)
-
-
-    # 清理顺序不能修改，否则报错
-    await context.close()
-    await browser.close()
-    await p.stop()
+        if str(book['bookId']) in changed or not os.path.exists(filename):
+            covers.append((img_url, filename))
+
+    if shelfIndexes:
+        if books != old_books:
+            atomic_write_text(BOOK_SHELF_PATH, json.dumps(books, ensure_ascii=False, indent=4))
+        # syncBook 没有返回的书沿用了本地旧数据，不记录新标记
+        missing = set(delta.fetch) - {str(book['bookId']) for book in fetched}
+        shelf_index.update(shelfIndexes, [book['bookId'] for book in books if str(book['bookId']) not in missing],
+                           user_vid)
+
+    if covers:
+        async with CoverDownloader() as downloader:
+            await asyncio.gather(*[downloader.download(url, filename) for url, filename in covers])
+        print(f'封面：下载 {downloader.saved}，未变化 {downloader.not_modified}，失败 {downloader.failed}')
 
     if user_data:
         open('user_info.json', 'w', encoding='utf8')\
             .write(json.dumps(user_data, ensure_ascii=False, indent=4))
 
-    return user_data, books
+    return user_data, books, delta
+
 
 if __name__ == '__main__':
 
@@ -0,0 +1,113 @@
+'''
+书架的增量同步 SHELF_INDEX_PATH
+
+{
+    "userVid": 书架所属用户,
+    "markers": {"<bookId>": 更新标记}
+}
+
+书架页 __INITIAL_STATE__ 中的 shelfIndexes 列出了书架上所有书，每一项除位置（idx）外的字段作为这本书的更新标记。
+刷新时与上次保存的标记比较：
+
+- 新增或标记变化的书重新请求 syncBook
+- 不在 shelfIndexes 中的书从本地书架删除
+- 其余直接使用 book_shelf.json 中已有的数据
+
+书架没有变化时只需要加载一次书架页，不再请求 syncBook。
+'''
+import json
+import os
+
+from book_manifest import atomic_write_text
+from constants import SHELF_INDEX_PATH
+
+# 只表示书在书架上的位置，变化时不需要重新请求
+POSITION_KEYS = {'idx'}
+
+
+def book_marker(entry):
+    return json.dumps({k: v for k, v in entry.items() if k not in POSITION_KEYS}, sort_keys=True,
+                      ensure_ascii=False)
+
+
+class ShelfDelta:
+
+    def __init__(self, fetch, added, updated, removed):
+        # 需要请求 syncBook 的 bookId，按书架顺序
+        self.fetch = fetch
+        self.added = added
+        self.updated = updated
+        self.removed = removed
+
+    @property
+    def changed(self):
+        return bool(self.added or self.updated or self.removed)
+
+    def __str__(self):
+        return f'新增 {self.added} 本，更新 {self.updated} 本，移除 {self.removed} 本'
+
+
+class ShelfIndex:
+
+    def __init__(self, path=SHELF_INDEX_PATH):
+        self.path = path
+        self.user_vid = None
+        self.markers = {}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            data = json.load(open(self.path, encoding='utf8'))
+            self.user_vid = data.get('userVid')
+            self.markers = data.get('markers', {})
+        except (OSError, ValueError):
+            self.markers = {}
+
+    def diff(self, indexes, books, user_vid=None):
+        '''
+        :param indexes: 书架页的 shelfIndexes
+        :param books: book_shelf.json 中已有的书
+        :param user_vid: 当前登录用户，与上次同步的用户不同时全部重新请求
+        '''
+        markers = self.markers if user_vid is None or user_vid == self.user_vid else {}
+        local = {str(book['bookId']) for book in books}
+
+        fetch = []
+        added = updated = 0
+        for entry in indexes:
+            book_id = str(entry['bookId'])
+            old = markers.get(book_id)
+            if old is None or book_id not in local:
+                fetch.append(book_id)
+                added += 1
+            elif old != book_marker(entry):
+                fetch.append(book_id)
+                updated += 1
+
+        current = {str(entry['bookId']) for entry in indexes}
+        removed = len(local - current)
+        return ShelfDelta(fetch, added, updated, removed)
+
+    @staticmethod
+    def merge(indexes, books, fetched):
+        '''
+        按 shelfIndexes 的顺序组合书架：请求到的新数据优先，其余沿用本地数据，不在书架上的丢弃
+        '''
+        by_id = {str(book['bookId']): book for book in books}
+        by_id.update((str(book['bookId']), book) for book in fetched)
+        return [by_id[str(entry['bookId'])] for entry in indexes if str(entry['bookId']) in by_id]
+
+    def update(self, indexes, book_ids, user_vid=None):
+        '''
+        同步完成后保存标记，只记录确实拿到最新数据的书，下次刷新时其余的书会重新请求
+        :param book_ids: 本次 syncBook 返回的书和未变化的书；需要更新但 syncBook 没有返回的书不能包含在内，
+                         它们在书架中仍是旧数据
+        '''
+        synced = set(map(str, book_ids))
+        self.user_vid = user_vid
+        self.markers = {str(entry['bookId']): book_marker(entry) for entry in indexes
+                        if str(entry['bookId']) in synced}
+        atomic_write_text(self.path, json.dumps({'userVid': self.user_vid, 'markers': self.markers},
+                                                ensure_ascii=False))
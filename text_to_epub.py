@@ -16,6 +16,7 @@ from bs4 import BeautifulSoup, XMLParsedAsHTMLWarning
 import requests
 
 from constants import WKHTMLTOPDF_DIR
+from retry_policy import RetryPolicy
 
 
 class BuilderThread(QThread):
@@ -629,18 +630,13 @@ class PdfBuilder(BuilderThread):
             "User-Agent": "Mozilla/5.0",
             "Referer": "https://weread.qq.com/"
         }
-        while True:
-            try:
-                r = requests.get(url, headers=headers, timeout=10)
-                if r.status_code == 200:
-                    img_path.write_bytes(r.content)
-                    break
-                else:
-                    self.send(f"下载失败：{url}  {r.status_code}  ",)
-
-            except:
-                traceback.print_exc()
-                self.send(f"下载失败-重试：{url}",)
+        # 退避重试，失败后跳过这张图片，不再无限重试
+        try:
+            r = RetryPolicy('image').run_sync(lambda: requests.get(url, headers=headers, timeout=10))
+            img_path.write_bytes(r.content)
+        except Exception as e:
+            traceback.print_exc()
+            self.send(f"下载失败：{url}  {e}",)
 
 def process_xhtml(xhtml: str):
     soup = BeautifulSoup(xhtml, "lxml-xml")